@@ -0,0 +1,249 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from graph.Generator import part_from_seed, random_problem_id, random_seed
+from graph.DedupIndex import DedupIndex, DEDUP_INDEX_FILE
+from graph.Symmetry import canonical_hash
+from graph.StartStatistics import StartStatistics, START_STATISTICS_FILE
+from puzzle.Generator import generate_problem_from_seed, generate_problems_vectorized
+from puzzle.PuzzleCache import PuzzleCache
+
+# Number of problems generated by a task of the vectorized generation
+VECTORIZED_CHUNK_SIZE = 64
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Generate many problems in parallel, one worker per core")
+    parser.add_argument("--part", type=int, default=1, help="Part of the game when seeds are drawn. 1, 2 or 3")
+    parser.add_argument("--count", type=int, default=None, help="Number of random seeds to generate")
+    parser.add_argument("--seeds", type=int, nargs=2, default=None, metavar=("FIRST", "LAST"),
+                        help="Range of seeds to generate, last included")
+    parser.add_argument("--nb_information", type=int, default=6,
+                        help="Number of information given about character's position in time 1. Between 0 and 6")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--pdf", action='store_true', default=False, help="Create the pdf of each problem")
+    parser.add_argument("--booklet", type=str, default=None,
+                        help="Name of a pdf where all the problems are written, one per page, in the order of the "
+                             "seeds")
+    parser.add_argument("--output", type=str, default=None, help="File where results are written, stdout by default")
+    parser.add_argument("--start_statistics", type=str, nargs="?", default=None, const=START_STATISTICS_FILE,
+                        help="Draw the start configurations in proportion to their rate of success learned in this "
+                             "json file, and update it. The seeds of the part 3 then don't give the same problems "
+                             "again, so these problems are identified by an id instead of a seed")
+    parser.add_argument("--dedup", type=str, nargs="?", default=None, const=DEDUP_INDEX_FILE,
+                        help="Mark the problems equivalent up to the symmetries of the map to a problem of this index "
+                             "and leave them out of the booklet, and add the new ones to the index")
+    parser.add_argument("--vectorized", action='store_true', default=False,
+                        help="Draw count problems of the part from thousands of random movements tested at once "
+                             "instead of searching the movements of each seed. No seed gives these problems, so they "
+                             "are identified by an id instead of a seed, and their cards show none")
+    return parser.parse_args()
+
+
+def get_seeds(args):
+    """
+    Get the seeds to generate from the arguments
+    :param args: The arguments
+    :return: the list of seeds
+    """
+    if args.seeds is not None:
+        first, last = args.seeds
+        seeds = list(range(first, last + 1))
+        for seed in seeds:
+            part_from_seed(seed)
+        return seeds
+    if args.count is None:
+        raise ValueError("A range of seeds or a count must be given")
+    seeds = set()
+    while len(seeds) < args.count:
+        seeds.add(random_seed(args.part))
+    return sorted(seeds)
+
+
+def generate_seed(seed, given_information, pdf=False, encode=False, start_statistics=None, dedup=False):
+    """
+    Generate the problem of a seed as main.py does. Run in a worker process
+    :param seed: The seed
+    :param given_information: Number of information given about character's position in time 1
+    :param pdf: If True, the pdf of the problem is created
+    :param encode: If True, the problem encoded by PuzzleCache.encode is added under "puzzle"
+    :param start_statistics: Optional StartStatistics drawing the start configurations. The counts learned are added
+    under "starts". A problem the seed doesn't give again gets an identifier under "id" instead of the seed
+    :param dedup: If True, the canonical hash of the problem is added under "canonical" (see Symmetry.canonical_hash)
+    :return: a dictionary with the seed, the number of tries, the duration and the solution or the error
+    """
+    start = time.perf_counter()
+    result = {"seed": seed, "part": part_from_seed(seed)}
+    try:
+        graph, cards, nb_tries = generate_problem_from_seed(seed, given_information,
+                                                            start_statistics=start_statistics)
+        result["tries"] = nb_tries
+        if graph.seed is None:
+            # The start rooms were drawn from the statistics: the seed doesn't give this problem again
+            del result["seed"]
+            result["id"] = random_problem_id()
+        describe_problem(result, graph, cards, pdf, encode, dedup)
+    except Exception as e:
+        result["error"] = str(e)
+    if start_statistics is not None:
+        result["starts"] = start_statistics.updates
+    result["duration"] = time.perf_counter() - start
+    return result
+
+
+def generate_vectorized(part, given_information, nb_problems, seed, pdf=False, encode=False, dedup=False):
+    """
+    Generate problems with generate_problems_vectorized. Run in a worker process
+    :param part: The part of the game
+    :param given_information: Number of information given about character's position in time 1
+    :param nb_problems: The number of problems
+    :param seed: The seed of the random generator of the movements
+    :param pdf: If True, the pdf of each problem is created
+    :param encode: If True, the problems encoded by PuzzleCache.encode are added under "puzzle"
+    :param dedup: If True, the canonical hashes of the problems are added under "canonical"
+    :return: the list of the results, as generate_seed, with the identifier of the problem under "id" instead of
+    the seed and the number of candidate movements drawn under "candidates" instead of the number of tries
+    """
+    results = []
+    start = time.perf_counter()
+    for problem_id, graph, cards, nb_candidates in generate_problems_vectorized(part, given_information, nb_problems,
+                                                                               seed=seed):
+        result = {"id": problem_id, "part": part, "candidates": nb_candidates}
+        describe_problem(result, graph, cards, pdf, encode, dedup)
+        result["duration"] = time.perf_counter() - start
+        start = time.perf_counter()
+        results.append(result)
+    return results
+
+
+def describe_problem(result, graph, cards, pdf=False, encode=False, dedup=False):
+    """
+    Add the solution of a problem to its result, and create its pdf
+    :param result: The dictionary of the result
+    :param graph: The graph of the problem
+    :param cards: The cards of the problem
+    :param pdf: If True, the pdf of the problem is created
+    :param encode: If True, the problem encoded by PuzzleCache.encode is added under "puzzle"
+    :param dedup: If True, the canonical hash of the problem is added under "canonical"
+    """
+    result["solution"] = {character.name: [character[t].name for t in range(1, graph.nb_times + 1)]
+                          for character in graph.characters.values()}
+    if dedup:
+        result["canonical"] = canonical_hash(graph, result["part"])
+    if encode:
+        result["puzzle"] = PuzzleCache.encode(graph, cards)
+    if pdf:
+        # Imported here so that workers only load the images when pdfs are created. The images must not be
+        # opened before the fork: the processes would share the file offsets
+        from card.Image_Creator import create_pdf_from_cards, card_cache, PDF_DIR
+        os.makedirs(PDF_DIR, exist_ok=True)
+        pdf_name = f"Kronologic_{result['seed'] if 'seed' in result else result['id']}.pdf"
+        hits, misses = card_cache.hits, card_cache.misses
+        create_pdf_from_cards(graph, cards, pdf_name=pdf_name, openPDF=False)
+        result["pdf"] = pdf_name
+        result["card_cache"] = {"hits": card_cache.hits - hits, "misses": card_cache.misses - misses}
+
+
+if __name__ == "__main__":
+    args = get_args()
+    if not 0 <= args.nb_information <= 6:
+        raise ValueError("Number of information given must be between 0 and 6")
+    if args.vectorized and (args.count is None or args.seeds is not None or args.start_statistics):
+        raise ValueError("The vectorized generation needs a count, and draws its own seeds and start rooms")
+    seeds = [] if args.vectorized else get_seeds(args)
+    start_statistics = StartStatistics.load(args.start_statistics) if args.start_statistics else None
+    dedup_index = DedupIndex(args.dedup) if args.dedup else None
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    nb_done = 0
+    failures = []
+    duplicates = []
+    tries = []
+    candidates = []
+    cache_hits = 0
+    cache_misses = 0
+    start = time.perf_counter()
+
+    def puzzles(results):
+        """
+        Write the results as soon as they are done, one json per line, and give the problems to the booklet
+        :param results: The results of the seeds, in the order of the seeds when a booklet is created
+        :return: a generator of (graph, cards)
+        """
+        global nb_done, cache_hits, cache_misses
+        for result in results:
+            # The problems no seed gives again, vectorized or drawn from the start statistics, have an identifier
+            # instead of a seed
+            seed = result.get("seed")
+            identifier = seed if seed is not None else result["id"]
+            puzzle = result.pop("puzzle", None)
+            starts = result.pop("starts", None)
+            if starts is not None:
+                start_statistics.merge(starts)
+            if "canonical" in result:
+                duplicate_of = dedup_index.add(result["part"], args.nb_information, result["canonical"], identifier)
+                if duplicate_of is not None:
+                    result["duplicate_of"] = duplicate_of
+                    duplicates.append(identifier)
+                    puzzle = None
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            nb_done += 1
+            if "error" in result:
+                failures.append(identifier)
+            elif "candidates" in result:
+                candidates.append(result["candidates"])
+            else:
+                tries.append(result["tries"])
+            if "card_cache" in result:
+                cache_hits += result["card_cache"]["hits"]
+                cache_misses += result["card_cache"]["misses"]
+            if puzzle is not None:
+                yield PuzzleCache.decode(seed, args.nb_information, *puzzle, part=result["part"])
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        if args.vectorized:
+            chunks = [min(VECTORIZED_CHUNK_SIZE, args.count - i) for i in range(0, args.count, VECTORIZED_CHUNK_SIZE)]
+            futures = [executor.submit(generate_vectorized, args.part, args.nb_information, nb_problems,
+                                       random.getrandbits(64), args.pdf, args.booklet is not None,
+                                       dedup_index is not None) for nb_problems in chunks]
+            # The problems of a chunk are written when the whole chunk is done
+            done = futures if args.booklet else as_completed(futures)
+            results = (result for future in done for result in future.result())
+        else:
+            futures = [executor.submit(generate_seed, seed, args.nb_information, args.pdf, args.booklet is not None,
+                                       start_statistics, dedup_index is not None) for seed in seeds]
+            results = (future.result() for future in (futures if args.booklet else as_completed(futures)))
+        if args.booklet:
+            # Imported after the workers are started, the images must not be opened before the fork
+            from card.Image_Creator import create_booklet, PDF_DIR
+            os.makedirs(PDF_DIR, exist_ok=True)
+            create_booklet(puzzles(results), pdf_name=args.booklet)
+        else:
+            for _ in puzzles(results):
+                pass
+    elapsed = time.perf_counter() - start
+    if output is not sys.stdout:
+        output.close()
+    if start_statistics is not None:
+        start_statistics.save(args.start_statistics)
+
+    unit = "problems" if args.vectorized else "seeds"
+    print(f"\n{nb_done} {unit} in {elapsed:.2f}s with {args.workers} workers : {nb_done / elapsed:.1f} {unit}/s",
+          file=sys.stderr)
+    print(f"\tFailures : {len(failures)} {failures if failures else ''}", file=sys.stderr)
+    if dedup_index is not None:
+        print(f"\tDuplicates skipped : {len(duplicates)} {duplicates if duplicates else ''}", file=sys.stderr)
+    if tries:
+        print(f"\tTries per seed : mean {sum(tries) / len(tries):.2f}, max {max(tries)}", file=sys.stderr)
+    if candidates:
+        print(f"\tCandidate movements per problem : mean {sum(candidates) / len(candidates):.1f}, "
+              f"max {max(candidates)}", file=sys.stderr)
+    if cache_hits + cache_misses:
+        print(f"\tCard render cache : {cache_hits} hits, {cache_misses} misses, "
+              f"hit rate {cache_hits / (cache_hits + cache_misses):.1%}", file=sys.stderr)
@@ -0,0 +1,290 @@
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from graph.Graph import Graph
+from graph.Room import Room
+from graph.Rule import Rule, nb_max_characters_in_starting_room
+from card.Card import Card
+from puzzle.Generator import generate_problem_from_seed
+from benchmarks.rules_benchmark import random_moves, run
+
+# Rendering of one seed in a fresh process, printing the growth of its peak resident memory in bytes during the
+# rendering. On Linux, ru_maxrss is kept across the fork and the exec of the process, so it starts at the peak of the
+# benchmark: the peak of the process alone is read in /proc/self/status
+RENDER_MEMORY_SCRIPT = """
+import os, resource, sys
+sys.path.insert(0, {root!r})
+from card.Card import Card
+from card.Image_Creator import create_pdf_from_cards
+from puzzle.Generator import generate_problem_from_seed
+
+def peak_memory():
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status") as f:
+            return next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmHWM:"))
+    # ru_maxrss is in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+graph, _, _ = generate_problem_from_seed({seed}, {given_information})
+before = peak_memory()
+cards = Card.create_cards(graph, part={part})
+create_pdf_from_cards(graph, cards, pdf_name={pdf_name!r}, openPDF=False)
+print(peak_memory() - before)
+"""
+
+# Metrics compared in regression mode, and whether a higher value is better
+COMPARED_METRICS = {
+    "generation.p50": False,
+    "generation.p90": False,
+    "generation.mean": False,
+    "generation.tries_mean": False,
+    "generation.paths_tried_mean": False,
+    "rules.incremental": True,
+    "rendering.cards_mean": False,
+    "rendering.pdf_mean": False,
+    "rendering.peak_memory": False,
+}
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Benchmark of the generation, the rule checks and the rendering over "
+                                                 "fixed seeds. The results are written as json")
+    parser.add_argument("--parts", type=int, nargs="+", default=[1, 2, 3], help="Parts of the game to benchmark")
+    parser.add_argument("--nb_seeds", type=int, default=50, help="Number of seeds generated for each part")
+    parser.add_argument("--nb_moves", type=int, default=20000, help="Number of random moves for the rule checks")
+    parser.add_argument("--nb_renders", type=int, default=3, help="Number of seeds rendered for each part, 0 to skip")
+    parser.add_argument("--nb_information", type=int, default=6,
+                        help="Number of information given about character's position in time 1. Between 0 and 6")
+    parser.add_argument("--output", type=str, default=None, help="File where results are written, stdout by default")
+    parser.add_argument("--compare", type=str, default=None,
+                        help="Json file of a previous run. Exit with status 1 if a metric regressed")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative change of a metric considered as a regression in compare mode")
+    return parser.parse_args()
+
+
+def percentile(values, p):
+    """
+    Get a percentile of values, by linear interpolation
+    :param values: The values, not empty
+    :param p: The percentile, between 0 and 100
+    :return: the percentile
+    """
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    i = int(k)
+    if i + 1 == len(values):
+        return values[i]
+    return values[i] + (values[i + 1] - values[i]) * (k - i)
+
+
+def seeds_of_part(part, nb_seeds):
+    """
+    Get the fixed seeds of a part
+    :param part: The part of the game
+    :param nb_seeds: The number of seeds
+    :return: the list of seeds
+    """
+    return [part * 10000000 + i for i in range(nb_seeds)]
+
+
+def benchmark_generation(part, nb_seeds, given_information):
+    """
+    Generate the problems of the fixed seeds of a part
+    :param part: The part of the game
+    :param nb_seeds: The number of seeds
+    :param given_information: Number of information given about character's position in time 1
+    :return: a dictionary with the latency percentiles in seconds, the start configurations, the start configurations
+    rejected before the search and the paths tried
+    """
+    durations = []
+    tries = []
+    paths_tried = []
+    infeasible_starts = []
+    failures = []
+    for seed in seeds_of_part(part, nb_seeds):
+        stats = {}
+        start = time.perf_counter()
+        try:
+            _, _, nb_tries = generate_problem_from_seed(seed, given_information, stats=stats)
+        except Exception:
+            failures.append(seed)
+            continue
+        durations.append(time.perf_counter() - start)
+        tries.append(nb_tries)
+        paths_tried.append(stats.get("paths_tried", 0))
+        infeasible_starts.append(stats.get("infeasible_starts", 0))
+    if not durations:
+        return {"failures": failures}
+    return {
+        "p50": percentile(durations, 50),
+        "p90": percentile(durations, 90),
+        "p99": percentile(durations, 99),
+        "max": max(durations),
+        "mean": sum(durations) / len(durations),
+        "tries_mean": sum(tries) / len(tries),
+        "tries_max": max(tries),
+        "paths_tried_mean": sum(paths_tried) / len(paths_tried),
+        "paths_tried_max": max(paths_tried),
+        "infeasible_starts_mean": sum(infeasible_starts) / len(infeasible_starts),
+        "failures": failures,
+    }
+
+
+def benchmark_rules(part, nb_moves):
+    """
+    Measure the rule checks per second of a part on random moves
+    :param part: The part of the game
+    :param nb_moves: The number of moves
+    :return: a dictionary with the rule checks per second, from scratch and incremental
+    """
+    random.seed(part)
+    graph = Graph(rooms=Room.create_rooms(), nb_max_in_starting_room=nb_max_characters_in_starting_room(part))
+    rules = Rule.rules_for_part(part, graph)
+    moves = random_moves(graph, nb_moves)
+    snapshot = graph.board.snapshot()
+    from_scratch = run(graph, rules, moves, from_scratch=True)
+    graph.board.restore(snapshot)
+    incremental = run(graph, rules, moves, from_scratch=False)
+    return {"from_scratch": from_scratch, "incremental": incremental}
+
+
+def benchmark_rendering(part, nb_renders, given_information):
+    """
+    Measure the creation of the cards and of the pdf of the first fixed seeds of a part
+    :param part: The part of the game
+    :param nb_renders: The number of seeds rendered
+    :param given_information: Number of information given about character's position in time 1
+    :return: a dictionary with the mean durations in seconds and the growth of the peak resident memory in bytes
+    while rendering
+    """
+    # Imported here so that the images are only loaded when the rendering is benchmarked
+    from card.Image_Creator import create_pdf_from_cards
+
+    cards_durations = []
+    pdf_durations = []
+    with tempfile.TemporaryDirectory() as directory:
+        seeds = seeds_of_part(part, nb_renders + 1)
+        for seed in seeds[:-1]:
+            graph, _, _ = generate_problem_from_seed(seed, given_information)
+            start = time.perf_counter()
+            cards = Card.create_cards(graph, part=part)
+            cards_durations.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            create_pdf_from_cards(graph, cards, pdf_name=os.path.join(directory, f"{seed}.pdf"), openPDF=False)
+            pdf_durations.append(time.perf_counter() - start)
+
+        # The memory is measured on one more seed, in a fresh process whose peak resident memory only comes from this
+        # seed: tracemalloc doesn't see the buffers of the images allocated by Pillow
+        peak_memory = render_peak_memory(seeds[-1], part, given_information,
+                                         os.path.join(directory, f"{seeds[-1]}.pdf"))
+    return {
+        "cards_mean": sum(cards_durations) / len(cards_durations),
+        "pdf_mean": sum(pdf_durations) / len(pdf_durations),
+        "peak_memory": peak_memory,
+    }
+
+
+def render_peak_memory(seed, part, given_information, pdf_name):
+    """
+    Render a seed in a fresh process and measure the growth of its peak resident memory during the rendering
+    :param seed: The seed
+    :param part: The part of the game
+    :param given_information: Number of information given about character's position in time 1
+    :param pdf_name: The path of the pdf created
+    :return: the growth in bytes
+    """
+    script = RENDER_MEMORY_SCRIPT.format(root=ROOT, seed=seed, given_information=given_information, part=part,
+                                         pdf_name=pdf_name)
+    return int(subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                              cwd=ROOT).stdout.split()[-1])
+
+
+def git_commit():
+    """
+    Get the hash of the current commit
+    :return: the hash, None if it is unknown
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare the results of a run with a previous one
+    :param results: The results of the run
+    :param baseline: The results of the previous run
+    :param threshold: Relative change considered as a regression
+    :return: the list of the regressions, as strings
+    """
+    regressions = []
+    for part, metrics in results["parts"].items():
+        if part not in baseline["parts"]:
+            continue
+        for name, higher_is_better in COMPARED_METRICS.items():
+            group, key = name.split(".")
+            old = baseline["parts"][part].get(group, {}).get(key)
+            new = metrics.get(group, {}).get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (higher_is_better and change < -threshold) or (not higher_is_better and change > threshold):
+                regressions.append(f"Part {part} {name} : {old:.6g} -> {new:.6g} ({change:+.1%})")
+    return regressions
+
+
+if __name__ == "__main__":
+    args = get_args()
+    if not 0 <= args.nb_information <= 6:
+        raise ValueError("Number of information given must be between 0 and 6")
+
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "nb_seeds": args.nb_seeds,
+        "nb_moves": args.nb_moves,
+        "nb_renders": args.nb_renders,
+        "parts": {},
+    }
+    for part in args.parts:
+        print(f"Part {part}...", file=sys.stderr)
+        metrics = {
+            "generation": benchmark_generation(part, args.nb_seeds, args.nb_information),
+            "rules": benchmark_rules(part, args.nb_moves),
+        }
+        if args.nb_renders > 0:
+            metrics["rendering"] = benchmark_rendering(part, args.nb_renders, args.nb_information)
+        results["parts"][str(part)] = metrics
+    # Maximum resident set size of the process, in kilobytes on Linux
+    results["max_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    text = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"Regression : {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regression above {args.threshold:.0%} against {args.compare}", file=sys.stderr)
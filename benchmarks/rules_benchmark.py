@@ -0,0 +1,81 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from graph.Graph import Graph
+from graph.Room import Room
+from graph.Rule import Rule, nb_max_characters_in_starting_room
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Number of rule checks per second, from scratch and incremental")
+    parser.add_argument("--part", type=int, default=1, help="Part of the game. 1, 2 or 3")
+    parser.add_argument("--nb_moves", type=int, default=20000, help="Number of random moves")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random moves")
+    return parser.parse_args()
+
+
+def random_moves(graph, nb_moves):
+    """
+    Create a list of random moves on the graph
+    :param graph: The graph
+    :param nb_moves: The number of moves
+    :return: a list of (character, room, time)
+    """
+    characters = list(graph.characters.values())
+    rooms = list(graph.rooms.values())
+    return [(random.choice(characters), random.choice(rooms), random.randint(2, graph.nb_times))
+            for _ in range(nb_moves)]
+
+
+def run(graph, rules, moves, from_scratch):
+    """
+    Play the moves and test every rule after each of them
+    :param graph: The graph
+    :param rules: The rules to test
+    :param moves: The moves returned by random_moves
+    :param from_scratch: If True, the rules are evaluated on the whole board, else incrementally. The counters of the
+    incremental evaluation are not updated by the moves played from scratch: the board must be restored (see
+    Board.restore) before the rules are evaluated incrementally again
+    :return: the number of rule checks per second
+    """
+    listeners = graph.board.listeners
+    if from_scratch:
+        # The moves played from scratch don't pay for the updates of the counters they don't use
+        graph.board.listeners = []
+    try:
+        start = time.perf_counter()
+        for character, room, t in moves:
+            character.set_room(room, t)
+            for rule in rules:
+                if from_scratch:
+                    rule.is_respected_from_scratch()
+                else:
+                    rule.is_respected()
+        elapsed = time.perf_counter() - start
+    finally:
+        graph.board.listeners = listeners
+    return len(moves) * len(rules) / elapsed
+
+
+if __name__ == "__main__":
+    args = get_args()
+    random.seed(args.seed)
+
+    graph = Graph(rooms=Room.create_rooms(), nb_max_in_starting_room=nb_max_characters_in_starting_room(args.part))
+    rules = Rule.rules_for_part(args.part, graph)
+    moves = random_moves(graph, args.nb_moves)
+
+    snapshot = graph.board.snapshot()
+    from_scratch = run(graph, rules, moves, from_scratch=True)
+    graph.board.restore(snapshot)
+    incremental = run(graph, rules, moves, from_scratch=False)
+
+    print(f"Part {args.part}, {args.nb_moves} moves, {len(rules)} rules")
+    print(f"\tFrom scratch : {from_scratch:,.0f} rule checks/s")
+    print(f"\tIncremental  : {incremental:,.0f} rule checks/s (including the counters update on each move)")
+    print(f"\tSpeedup      : x{incremental / from_scratch:.1f}")
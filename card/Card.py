@@ -1,6 +1,8 @@
 import numpy as np
 import random
 
+from graph.Room import Room
+
 cards_layout = [["Character_Journaliste_Share",   "Time5_Solo",       "Time4_Solo",       "Time6_Share"],
                 ["Baronne_Solo",        "Time1_Share",      "Time3_Share",      "Servante_Share"],
                 ["Aventuriere_Solo",    "Chauffeur_Solo",   "Time2_Share",      "Detective_Solo"],
@@ -56,7 +58,9 @@ layout = {
 
 
 class Card:
-    def __init__(self, room, characters, seed=None, part=1):
+    def __init__(self, room, characters, seed=None, part=1, rng=None):
+        if rng is None:
+            rng = random.Random()
         self.room = room
         self.icons = np.empty((6, 4), dtype=object)
         self.seed = seed
@@ -75,7 +79,7 @@ class Card:
             if len(time) == 0 or (character.information_given and time == [1]):
                 self.icons[layout["Characters"]["Solo"]["Names"][character.name]] = "Retry"
             else:
-                time_displayed = random.choice([t for t in time if (not character.information_given or t != 1)])
+                time_displayed = rng.choice([t for t in time if (not character.information_given or t != 1)])
                 self.icons[layout["Characters"]["Solo"]["Names"][character.name]] = f"T{time_displayed}"
 
         # Fill time icons
@@ -84,22 +88,49 @@ class Card:
             if len(characters) == 0:
                 self.icons[layout["Times"]["Solo"][f"Time{time}"]] = "Retry"
             else:
-                character_displayed = random.choice(characters).name
+                character_displayed = rng.choice(characters).name
                 self.icons[layout["Times"]["Solo"][f"Time{time}"]] = character_displayed
 
+    def __getstate__(self):
+        # The room is replaced by a copy out of the board, which holds the rules of the graph: a pickled card can be
+        # drawn, by a worker process for instance, but its room has no characters
+        state = self.__dict__.copy()
+        room = Room(self.room.name, nb_times=self.room.nb_times)
+        room.id = self.room.id
+        state["room"] = room
+        return state
+
+    @staticmethod
+    def from_icons(room, icons, seed=None, part=1):
+        """
+        Create a card whose icons are already known, without drawing them
+        :param room: The room of the card
+        :param icons: The icons, a 6x4 array
+        :param seed: The seed of the game
+        :param part: The part of the game
+        :return: a Card
+        """
+        card = Card.__new__(Card)
+        card.room = room
+        card.icons = icons
+        card.seed = seed
+        card.part = part
+        return card
+
     @staticmethod
     def create_cards(graph, show_seed=True, part=1):
         """
-        Create the cards for each room
+        Create the cards for each room. The icons are drawn with the random generator of the graph
         :param graph: The graph
-        :param seed: The seed of the game
+        :param show_seed: If True, the seed of the graph is shown on the cards
+        :param part: The part of the game
         :return: a list of cards
         """
         cards = []
         for room in graph.rooms.values():
             if show_seed:
-                cards.append(Card(room, graph.characters, seed=graph.seed, part=part))
+                cards.append(Card(room, graph.characters, seed=graph.seed, part=part, rng=graph.rng))
             else:
-                cards.append(Card(room, graph.characters, part=part))
+                cards.append(Card(room, graph.characters, part=part, rng=graph.rng))
         return cards
 
@@ -1,103 +1,385 @@
+import functools
+import math
 import os
+import threading
+from collections import OrderedDict
 from PIL import Image, ImageFont, ImageDraw
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
 import webbrowser
 
+from card.PdfWriter import StreamingPdf, CanvasPdf
+
 IMG_PATH = 'imgs/png/'
-BLANK_PATH = os.path.join(IMG_PATH, 'Blank.png')
 PDF_DIR = 'pdfs/'
 
-# Load the blank image for the background of a card
-background = Image.open(BLANK_PATH)
+# Pixels per point of the images placed in a pdf, the resolution of the card images drawn by add_img_to_pdf
+PDF_PIXELS_PER_POINT = 2
 
+# Position, rotation and size of the seed text in a card image and in the map image
+CARD_SEED_TEXT = {"x": 95, "y": 500, "rotation": 90, "size": 100}
+MAP_SEED_TEXT = {"x": 0, "y": 40, "rotation": 0, "size": 14}
 
+# Files of the images, loaded on first use (see ImageCache)
 # TODO X4 X5 X6
-# Load all images
-images = {
-    "Aventuriere": Image.open(os.path.join(IMG_PATH, 'Aventuriere.png')),
-    "Baronne": Image.open(os.path.join(IMG_PATH, 'Baronne.png')),
-    "Chauffeur": Image.open(os.path.join(IMG_PATH, 'Chauffeur.png')),
-    "Detective": Image.open(os.path.join(IMG_PATH, 'Detective.png')),
-    "Journaliste": Image.open(os.path.join(IMG_PATH, 'Journaliste.png')),
-    "Servante": Image.open(os.path.join(IMG_PATH, 'Servante.png')),
-    "Retry": Image.open(os.path.join(IMG_PATH, 'Retry.png')),
-    "X0": Image.open(os.path.join(IMG_PATH, 'X0.png')),
-    "X1": Image.open(os.path.join(IMG_PATH, 'X1.png')),
-    "X2": Image.open(os.path.join(IMG_PATH, 'X2.png')),
-    "X3": Image.open(os.path.join(IMG_PATH, 'X3.png')),
-    #"X4": Image.open(os.path.join(IMG_PATH, 'X4.png')),
-    #"X5": Image.open(os.path.join(IMG_PATH, 'X5.png')),
-    #"X6": Image.open(os.path.join(IMG_PATH, 'X6.png')),
-    "T1": Image.open(os.path.join(IMG_PATH, 'T1.png')),
-    "T2": Image.open(os.path.join(IMG_PATH, 'T2.png')),
-    "T3": Image.open(os.path.join(IMG_PATH, 'T3.png')),
-    "T4": Image.open(os.path.join(IMG_PATH, 'T4.png')),
-    "T5": Image.open(os.path.join(IMG_PATH, 'T5.png')),
-    "T6": Image.open(os.path.join(IMG_PATH, 'T6.png')),
-    "Stairs": Image.open(os.path.join(IMG_PATH, 'Stairs.png')),
-    "Room": Image.open(os.path.join(IMG_PATH, 'Room.png')),
-    "Hallway": Image.open(os.path.join(IMG_PATH, 'Hallway.png')),
-    "Scene": Image.open(os.path.join(IMG_PATH, 'Scene.png')),
-    "Sing Room": Image.open(os.path.join(IMG_PATH, 'Sing_Room.png')),
-    "Dance Room": Image.open(os.path.join(IMG_PATH, 'Dance_Room.png')),
-    "Txt_Scene": Image.open(os.path.join(IMG_PATH, 'Txt_Scene.png')),
-    "Txt_Sing Room": Image.open(os.path.join(IMG_PATH, 'Txt_Sing.png')),
-    "Txt_Dance Room": Image.open(os.path.join(IMG_PATH, 'Txt_Dance.png')),
-    "Txt_Room": Image.open(os.path.join(IMG_PATH, 'Txt_Room.png')),
-    "Txt_Hallway": Image.open(os.path.join(IMG_PATH, 'Txt_Hallway.png')),
-    "Txt_Stairs": Image.open(os.path.join(IMG_PATH, 'Txt_Stairs.png')),
-    "Part_1": Image.open(os.path.join(IMG_PATH, 'Txt_Part_1.png')),
-    "Part_2": Image.open(os.path.join(IMG_PATH, 'Txt_Part_2.png')),
-    "Map": Image.open(os.path.join(IMG_PATH, 'Map.png')),
+IMAGE_FILES = {
+    "Background": 'Blank.png',
+    "Aventuriere": 'Aventuriere.png',
+    "Baronne": 'Baronne.png',
+    "Chauffeur": 'Chauffeur.png',
+    "Detective": 'Detective.png',
+    "Journaliste": 'Journaliste.png',
+    "Servante": 'Servante.png',
+    "Retry": 'Retry.png',
+    "X0": 'X0.png',
+    "X1": 'X1.png',
+    "X2": 'X2.png',
+    "X3": 'X3.png',
+    #"X4": 'X4.png',
+    #"X5": 'X5.png',
+    #"X6": 'X6.png',
+    "T1": 'T1.png',
+    "T2": 'T2.png',
+    "T3": 'T3.png',
+    "T4": 'T4.png',
+    "T5": 'T5.png',
+    "T6": 'T6.png',
+    "Stairs": 'Stairs.png',
+    "Room": 'Room.png',
+    "Hallway": 'Hallway.png',
+    "Scene": 'Scene.png',
+    "Sing Room": 'Sing_Room.png',
+    "Dance Room": 'Dance_Room.png',
+    "Txt_Scene": 'Txt_Scene.png',
+    "Txt_Sing Room": 'Txt_Sing.png',
+    "Txt_Dance Room": 'Txt_Dance.png',
+    "Txt_Room": 'Txt_Room.png',
+    "Txt_Hallway": 'Txt_Hallway.png',
+    "Txt_Stairs": 'Txt_Stairs.png',
+    "Part_1": 'Txt_Part_1.png',
+    "Part_2": 'Txt_Part_2.png',
+    "Part_3": 'Txt_Part_3.png',
+    "Map": 'Map.png',
 }
 
 
+class ImageCache:
+    """
+    Cache of the images, loaded from the disk on first use.
+    Each image is decoded and converted to RGBA once, and resized once for each size asked, so that pasting it does
+    not need any conversion. The least recently used images are dropped when the cache is full.
+    The images returned are shared: they must be copied before being modified.
+    """
+
+    def __init__(self, files, img_path=IMG_PATH, max_size=128):
+        """
+        :param files: dictionary name -> file of the image in img_path
+        :param img_path: The directory of the images
+        :param max_size: Maximum number of images kept, all sizes included
+        """
+        self.files = files
+        self.img_path = img_path
+        self.max_size = max_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, name, size=None):
+        """
+        Get an image
+        :param name: The name of the image
+        :param size: The maximum (width, height) of the image, the ratio is kept. The original size by default
+        :return: the image, in RGBA
+        """
+        key = (name, size)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+
+        if size is None:
+            with Image.open(os.path.join(self.img_path, self.files[name])) as file:
+                img = file.convert("RGBA")
+        else:
+            img = self.get(name).copy()
+            img.thumbnail(size)
+
+        with self.lock:
+            self.cache[key] = img
+            if len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+        return img
+
+    def get_scaled(self, name, scale, rotation=0, size=None):
+        """
+        Get an image rotated and scaled, to be pasted directly in an image composed at a print resolution
+        :param name: The name of the image
+        :param scale: The scale of the image
+        :param rotation: The rotation of the image, a multiple of 90 degrees counterclockwise
+        :param size: The maximum size of the image before scaling (see get)
+        :return: the image, in RGBA
+        """
+        key = (name, size, scale, rotation)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+
+        img = self.get(name, size)
+        for _ in range(rotation // 90 % 4):
+            img = img.transpose(Image.Transpose.ROTATE_90)
+        img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.LANCZOS)
+
+        with self.lock:
+            self.cache[key] = img
+            if len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+        return img
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    def __contains__(self, name):
+        return name in self.files
+
+    def clear(self):
+        """
+        Remove all the images from the cache
+        """
+        with self.lock:
+            self.cache.clear()
+
+
+images = ImageCache(IMAGE_FILES)
+
+
+class CardRenderCache:
+    """
+    Cache of the frames of the card images: the background, the icon and the name of the room and the name of the
+    part, the same on every card of a room in a part. The hints, which change from a problem to another, and the seed
+    are drawn over a copy of the frame. The frames are keyed by the room, the part and the resolution, so the 8 frames
+    of a part are composited once for a whole batch. The least recently used frames are dropped when the cache is full.
+    """
+
+    def __init__(self, max_size=8):
+        """
+        :param max_size: Maximum number of frames kept, the 8 rooms of a part by default. A frame is a full size card
+        image
+        """
+        self.max_size = max_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(card, dpi=None):
+        """
+        Get the key of the frame of a card
+        :param card: The card
+        :param dpi: The resolution of the frame, None for the full size frame
+        :return: the room and the part of the card, and the resolution
+        """
+        return card.room.name, card.part, dpi
+
+    def get(self, card, dpi=None):
+        """
+        Get the frame of a card image, created if it is not in the cache
+        :param card: The card
+        :param dpi: The resolution of the frame (see create_card_body_img_at_dpi), None for the full size frame
+        :return: the frame of the image. It is shared: it must be copied before being modified
+        """
+        key = CardRenderCache.key(card, dpi)
+        with self.lock:
+            if key in self.cache:
+                self.hits += 1
+                self.cache.move_to_end(key)
+                return self.cache[key]
+            self.misses += 1
+
+        frame = create_card_frame_img(card, dpi)
+        with self.lock:
+            self.cache[key] = frame
+            if len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+        return frame
+
+    def stats(self):
+        """
+        Get the metrics of the cache
+        :return: a dictionary with the number of hits and misses and the hit rate
+        """
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+
+card_cache = CardRenderCache()
+
+
 def create_img_from_card(card):
     """
     Create an image from a card with the icons and the room's name
     :param card: The card to create the image from
     :return: The image of the card
     """
-    img = background.copy()
+    img = create_card_body_img(card)
+
+    # Seed number, drawn last so that the body of the card can be shared
+    if card.seed is not None:
+        add_seed_number_to_img(img, card.seed, **CARD_SEED_TEXT)
+
+    return img
+
+
+def create_card_body_img(card):
+    """
+    Create the image of a card without the seed number: the hints drawn over a copy of the cached frame
+    :param card: The card to create the image from
+    :return: The image of the card
+    """
+    img = card_cache.get(card).copy()
+    paste_placements(img, get_hint_placements(card))
+    return img
+
+
+def create_card_body_img_at_dpi(card, dpi):
+    """
+    Create the image of a card without the seed number, composed directly at the size and orientation it is printed
+    at in the pdf: the background and the icons are rotated and scaled once for each resolution (see
+    ImageCache.get_scaled), instead of composing the card at full size before reducing it
+    :param card: The card to create the image from
+    :param dpi: The resolution of the card in the pdf
+    :return: The image of the card, rotated as in the pdf
+    """
+    img = card_cache.get(card, dpi).copy()
+    paste_placements(img, get_hint_placements(card), dpi)
+    return img
+
+
+def create_card_frame_img(card, dpi=None):
+    """
+    Create the frame of a card image: the background, the icon and the name of the room and the name of the part
+    :param card: The card to create the frame from
+    :param dpi: The resolution of the card in the pdf (see create_card_body_img_at_dpi), None for the full size frame
+    :return: The frame, rotated as in the pdf if a resolution is given
+    """
+    if dpi is None:
+        img = images["Background"].copy()
+    else:
+        img = images.get_scaled("Background", get_print_scale(dpi), rotation=90).copy()
+    paste_placements(img, get_frame_placements(card), dpi)
+    return img
 
-    # Hint icons in the card
+
+def paste_placements(img, placements, dpi=None):
+    """
+    Paste images over a card image
+    :param img: The card image, full size or composed at a print resolution
+    :param placements: The images, as returned by get_card_placements
+    :param dpi: The resolution of the card image, None for the full size image
+    """
+    if dpi is None:
+        for name, size, coords in placements:
+            icon = images.get(name, size)
+            img.paste(icon, coords, icon)
+        return
+    scale = get_print_scale(dpi)
+    full_width = images["Background"].width
+    for name, size, (x, y) in placements:
+        icon = images.get_scaled(name, scale, rotation=90, size=size)
+        width = images.get(name, size).width
+        # A point (x, y) of the card is at (y, full_width - x) once the card is rotated
+        img.paste(icon, (round(y * scale), round((full_width - x - width) * scale)), icon)
+
+
+def get_print_scale(dpi):
+    """
+    Get the scale of a card image printed at a resolution
+    :param dpi: The resolution of the card in the pdf
+    :return: the ratio of the size of the printed card to the size of the card image
+    """
+    width, height = images["Background"].size
+    box = get_pdf_box((0, 0), (width, height))
+    return box[2] * dpi / 72 / height
+
+
+def get_card_placements(card):
+    """
+    Get the images drawn over the background of a card, in the order they are drawn
+    :param card: The card
+    :return: a list of (name of the image, maximum size of the image or None, coordinates in the card image)
+    """
+    return get_hint_placements(card) + get_frame_placements(card)
+
+
+def get_hint_placements(card):
+    """
+    Get the hint icons of a card
+    :param card: The card
+    :return: a list of (name of the image, maximum size of the image or None, coordinates in the card image)
+    """
+    placements = []
     for col in range(4):
         for lin in range(6):
             if card.icons[lin, col] is not None:
-                icon = images[card.icons[lin, col]]
-                img.paste(icon, get_hint_icon_img_coords(col, lin), icon)
+                placements.append((card.icons[lin, col], None, get_hint_icon_img_coords(col, lin)))
+    return placements
 
-    # Icon of the room
-    room_icon = images[card.room.name]
-    img.paste(room_icon, get_room_icon_coords(), room_icon)
 
-    # Seed number
-    if card.seed is not None:
-        add_seed_number_to_img(img, card.seed)
+def get_frame_placements(card):
+    """
+    Get the images of a card which only depend on its room and its part. They don't overlap the hint icons
+    :param card: The card
+    :return: a list of (name of the image, maximum size of the image or None, coordinates in the card image)
+    """
+    placements = []
+
+    # Icon of the room
+    placements.append((card.room.name, None, get_room_icon_coords()))
 
     # Room's name
     room_txt_img = images[f"Txt_{card.room.name}"]
-    img.paste(room_txt_img, (int(1550-room_txt_img.width/2), 500), room_txt_img)
+    placements.append((f"Txt_{card.room.name}", None, (int(1550-room_txt_img.width/2), 500)))
 
     # Part's name
     part_txt_img = images[f"Part_{card.part}"]
-    img.paste(part_txt_img, (int(1450-part_txt_img.width/2), -10), part_txt_img)
+    placements.append((f"Part_{card.part}", None, (int(1450-part_txt_img.width/2), -10)))
 
-    return img
+    return placements
 
 
-def create_pdf_from_cards(graph, cards, pdf_name="Kronologic.pdf", openPDF=True):
+def create_pdf_from_cards(graph, cards, pdf_name="Kronologic.pdf", openPDF=True, vector=False, executor=None,
+                          dpi=None):
     """
     Create a pdf from a list of cards
     :param graph: The graph of the game
     :param cards: The list of cards to put in the pdf
     :param pdf_name: The name of the pdf
     :param openPDF: If True, open the pdf automatically after creation
+    :param vector: If True, the cards are composed in the pdf: each asset is embedded once and placed where it is
+    pasted in the card images, and the seeds are drawn as text. Else each card is a single image
+    :param executor: Optional executor rasterizing the cards in parallel (see render_card_for_pdf). The images are
+    drawn in the order of the cards, so the pdf is the same as with a serial rendering
+    :param dpi: The resolution of the card images. The cards are then composed directly at this resolution. By
+    default, they are composed at full size and reduced to 500 pixels
     """
     pdf_file = os.path.join(PDF_DIR, pdf_name)
     can = canvas.Canvas(pdf_file, pagesize=A4)
 
+    if vector:
+        pdf = CanvasPdf(can)
+        if graph.given_information > 0:
+            characters_with_information = [c for c in graph.characters.values() if c.information_given]
+            draw_placements(pdf, "Map", get_map_placements(characters_with_information), (210, 680),
+                            rotation=0, size_multiplier=0.65, seed=graph.seed, seed_text=MAP_SEED_TEXT)
+        for i, card in enumerate(cards):
+            draw_placements(pdf, "Background", get_card_placements(card), get_pdf_coords(i % 2, i // 2),
+                            seed=card.seed, seed_text=CARD_SEED_TEXT)
+        can.save()
+        if openPDF:
+            webbrowser.open(os.path.abspath(pdf_file))
+        return
+
     # Add the map to pdf if there is some information given at start
     if graph.given_information > 0:
         characters_with_information = [c for c in graph.characters.values() if c.information_given]
@@ -107,9 +389,12 @@ def create_pdf_from_cards(graph, cards, pdf_name="Kronologic.pdf", openPDF=True)
     # Add the cards images to the pdf
     x = 0
     y = 0
-    for c in cards:
-        img = create_img_from_card(c)
-        add_img_to_pdf(can, img, x, y)
+    dpis = [dpi] * len(cards)
+    card_imgs = executor.map(render_card_for_pdf, cards, dpis) if executor is not None else \
+        map(render_card_for_pdf, cards, dpis)
+    card_size = None if dpi is None else get_pdf_box((0, 0), images["Background"].size)[2:]
+    for img in card_imgs:
+        draw_img_in_pdf(can, img, x, y, size=card_size)
         x += 1
         if x == 2:
             x = 0
@@ -121,6 +406,122 @@ def create_pdf_from_cards(graph, cards, pdf_name="Kronologic.pdf", openPDF=True)
         webbrowser.open(os.path.abspath(pdf_file))
 
 
+def create_booklet(puzzles, pdf_name="Kronologic_booklet.pdf"):
+    """
+    Create a pdf with one page per puzzle, laid out as the pdf of create_pdf_from_cards.
+    The pdf is streamed: each page is written in the file as soon as it is drawn, so the memory used does not depend on
+    the number of puzzles. The cards and the map are drawn from the images of the assets, each asset being embedded
+    once in the pdf and shared by all the pages, and the seeds are drawn as text
+    :param puzzles: An iterable of (graph, cards), consumed one puzzle at a time
+    :param pdf_name: The name of the pdf
+    :return: the number of puzzles in the pdf
+    """
+    nb_puzzles = 0
+    with StreamingPdf(os.path.join(PDF_DIR, pdf_name), pagesize=A4) as pdf:
+        for graph, cards in puzzles:
+            pdf.begin_page()
+            if graph.given_information > 0:
+                characters_with_information = [c for c in graph.characters.values() if c.information_given]
+                draw_placements(pdf, "Map", get_map_placements(characters_with_information), (210, 680),
+                                rotation=0, size_multiplier=0.65, seed=graph.seed, seed_text=MAP_SEED_TEXT)
+            for i, card in enumerate(cards):
+                draw_placements(pdf, "Background", get_card_placements(card), get_pdf_coords(i % 2, i // 2),
+                                seed=card.seed, seed_text=CARD_SEED_TEXT)
+            pdf.end_page()
+            nb_puzzles += 1
+    return nb_puzzles
+
+
+def draw_placements(pdf, background, placements, coords, rotation=90, size_multiplier=0.5, seed=None,
+                    seed_text=None, pixels_per_point=PDF_PIXELS_PER_POINT):
+    """
+    Draw an image made of placed images in a pdf, at the position and size the composited image would have with
+    add_img_to_pdf. The images are registered in the pdf the first time they are drawn, reduced to the resolution
+    they are printed at
+    :param pdf: The StreamingPdf or the CanvasPdf
+    :param background: The name of the background image
+    :param placements: The images drawn over the background, as returned by get_card_placements
+    :param coords: The coordinates of the image in the pdf
+    :param rotation: The rotation of the image, 0 or 90
+    :param size_multiplier: The size multiplier of the image in the pdf
+    :param seed: The seed drawn as text, None to draw no seed
+    :param seed_text: The position, rotation and size of the seed text in the image (see add_seed_number_to_img)
+    :param pixels_per_point: The resolution of the images in the pdf
+    """
+    img_size = images[background].size
+    box = get_pdf_box(coords, img_size, rotation, size_multiplier)
+    scale = box[2] / (img_size[1] if rotation == 90 else img_size[0])
+    for name, size, (x, y) in [(background, None, (0, 0))] + placements:
+        width, height = images.get(name, size).size
+        # Size of the image once printed, the image is not enlarged if it is smaller
+        print_size = (math.ceil(width * scale * pixels_per_point), math.ceil(height * scale * pixels_per_point))
+        key = (name, print_size)
+        if not pdf.has_image(key):
+            pdf.add_image(key, images.get(name, print_size))
+        pdf.draw_image(key, get_pdf_matrix(box, img_size, rotation, (x, y, width, height)))
+
+    if seed is not None:
+        text = f"Seed : {seed}"
+        center_x, center_y = get_seed_text_center(img_size, get_font(seed_text["size"]).getbbox(text),
+                                                  seed_text["rotation"])
+        center = get_pdf_point(box, img_size, rotation, (seed_text["x"] + center_x, seed_text["y"] + center_y))
+        pdf.draw_text(text, center, seed_text["size"] * scale, rotation=seed_text["rotation"] + rotation,
+                      color=(51, 44, 44))
+
+
+def get_pdf_box(coords, img_size, rotation=90, size_multiplier=0.5):
+    """
+    Get the box of an image in the pdf, as add_img_to_pdf draws it: rotated, reduced to 500 pixels at most and
+    multiplied by the size multiplier
+    :param coords: The coordinates of the image in the pdf
+    :param img_size: The size of the image
+    :param rotation: The rotation of the image, 0 or 90
+    :param size_multiplier: The size multiplier of the image in the pdf
+    :return: the (x, y, width, height) of the image in the pdf
+    """
+    width, height = img_size if rotation == 0 else (img_size[1], img_size[0])
+    scale = min(1, 500 / width, 500 / height)
+    return (coords[0], coords[1], round(width * scale) * size_multiplier,
+            round(height * scale) * size_multiplier)
+
+
+def get_pdf_point(box, img_size, rotation, point):
+    """
+    Get the coordinates in the pdf of a point of an image drawn in a box
+    :param box: The box of the image in the pdf (see get_pdf_box)
+    :param img_size: The size of the image
+    :param rotation: The rotation of the image, 0 or 90
+    :param point: The (x, y) of the point in the image, y going down
+    :return: the (x, y) of the point in the pdf, y going up
+    """
+    x, y, width, height = box
+    if rotation == 0:
+        return x + point[0] * width / img_size[0], y + height - point[1] * height / img_size[1]
+    if rotation == 90:
+        return x + point[1] * width / img_size[1], y + point[0] * height / img_size[0]
+    raise ValueError("Only rotations of 0 and 90 degrees are supported")
+
+
+def get_pdf_matrix(box, img_size, rotation, placement):
+    """
+    Get the matrix drawing an image placed in another image drawn in a box
+    :param box: The box of the image in the pdf (see get_pdf_box)
+    :param img_size: The size of the image
+    :param rotation: The rotation of the image, 0 or 90
+    :param placement: The (x, y, width, height) of the placed image in the image, y going down
+    :return: the matrix (a, b, c, d, e, f) mapping the unit square of the placed image to the pdf
+    """
+    x, y, width, height = box
+    px, py, p_width, p_height = placement
+    if rotation == 0:
+        sx, sy = width / img_size[0], height / img_size[1]
+        return sx * p_width, 0, 0, sy * p_height, x + sx * px, y + height - sy * (py + p_height)
+    if rotation == 90:
+        sx, sy = width / img_size[1], height / img_size[0]
+        return 0, sy * p_width, -sx * p_height, 0, x + sx * (py + p_height), y + sy * px
+    raise ValueError("Only rotations of 0 and 90 degrees are supported")
+
+
 def get_given_information_img(characters, seed=None):
     """
     Create an image with information given at start
@@ -128,8 +529,26 @@ def get_given_information_img(characters, seed=None):
     :param seed: The seed number to add to the image
     :return: an image with the characters icons on the map
     """
-    img = images["Map"]
+    img = images["Map"].copy()
+
+    # Add the characters icons to the image
+    for name, size, coords in get_map_placements(characters):
+        icon = images.get(name, size)
+        img.paste(icon, coords, icon)
+
+    # Add the seed number to the image
+    if seed is not None:
+        add_seed_number_to_img(img, seed, **MAP_SEED_TEXT)
 
+    return img
+
+
+def get_map_placements(characters):
+    """
+    Get the icons of the characters drawn over the map
+    :param characters: characters with information given at start
+    :return: a list of (name of the image, maximum size of the image, coordinates in the map image)
+    """
     # Coordinates of the icons in the img map. The count is used to know which coordinate to use depending on
     # the number of characters in the room
     icon_in_rooms_coords = {
@@ -141,47 +560,95 @@ def get_given_information_img(characters, seed=None):
         "Stairs": {'coords': [(50, 83), (50, 130), (80, 83), (50, 155), (80, 130), (80, 155)], 'count': 0},
     }
 
-    # Add the characters icons to the image
+    placements = []
     for c in characters:
-        icon = images[c.name].copy()
-        icon.thumbnail((30, 30))
         coords = icon_in_rooms_coords[c.times[1].name]
-        img.paste(icon, coords['coords'][coords['count']], icon)
+        placements.append((c.name, (30, 30), coords['coords'][coords['count']]))
         coords['count'] += 1
-
-    # Add the seed number to the image
-    if seed is not None:
-        add_seed_number_to_img(img, seed, x=0, y=40, rotation=0, size=14)
-
-    return img
+    return placements
 
 
 def add_seed_number_to_img(img, seed, x=95, y=500, rotation=90, size=100):
     """
     Add the seed number to a card image
-    :param img: The image of the card
+    :param img: The image of the card, in RGBA
     :param seed: The seed number to add
     :param x: The x coordinate of the seed text, 95 by default
     :param y: The y coordinate of the seed text, 500 by default
     :param rotation: The rotation of the seed text, 90 by default
     :param size: The size of the seed text, 100 by default
     """
-    # Draw seed number to another image
-    text_img = Image.new('RGBA', img.size, (255, 255, 255, 0))
-    draw = ImageDraw.Draw(text_img)
-    font = ImageFont.truetype("ariali.ttf", size)
-    draw.text((0, 0), f"Seed : {seed}", (51,44,44), font=font)
+    text = f"Seed : {seed}"
+    center_x, center_y = get_seed_text_center(img.size, get_font(size).getbbox(text), rotation)
+    width, height = img.size
+    # The text is cropped to the layer, which has the size of the image and is pasted at (x, y)
+    draw_seed_sprite(img, text, size, rotation, (center_x, center_y), offset=(x, y),
+                     bounds=(x, y, x + width, y + height))
 
-    # Rotate the text
-    text_img = text_img.rotate(rotation, expand=True)
 
-    # Create a new transparent image to keep the size of the original image
-    new_img = Image.new('RGBA', img.size, (255, 255, 255, 0))
-    new_img.paste(text_img, (0, 0))
-    text_img = new_img
-
-    # Paste the text image to the original image
-    img.paste(Image.alpha_composite(img, text_img), (x, y), text_img)
+def draw_seed_sprite(img, text, size, rotation, center, offset=(0, 0), bounds=None):
+    """
+    Draw the seed text as a small rotated sprite composited on the part of an image under it, instead of a layer of the
+    size of the image
+    :param img: The image, in RGBA
+    :param text: The seed text
+    :param size: The size of the font
+    :param rotation: The rotation of the text
+    :param center: The (x, y) coordinates of the center of the text, relative to the offset
+    :param offset: The (x, y) coordinates in the image the center is relative to, added once the sprite is placed
+    :param bounds: Optional (left, top, right, bottom) box of the image the text is cropped to. The text is always
+    cropped to the image
+    """
+    font = get_font(size)
+    left, top, right, bottom = font.getbbox(text)
+    sprite = Image.new('RGBA', (right - left, bottom - top), (255, 255, 255, 0))
+    ImageDraw.Draw(sprite).text((-left, -top), text, (51, 44, 44), font=font)
+    sprite = sprite.rotate(rotation, expand=True)
+    dest_x = offset[0] + round(center[0] - sprite.width / 2)
+    dest_y = offset[1] + round(center[1] - sprite.height / 2)
+
+    # Crop the sprite to the image and to the bounds
+    clip = (0, 0, img.width, img.height) if bounds is None else \
+        (max(0, bounds[0]), max(0, bounds[1]), min(img.width, bounds[2]), min(img.height, bounds[3]))
+    box = (max(clip[0], dest_x), max(clip[1], dest_y),
+           min(clip[2], dest_x + sprite.width), min(clip[3], dest_y + sprite.height))
+    if box[0] >= box[2] or box[1] >= box[3]:
+        return
+    sprite = sprite.crop((box[0] - dest_x, box[1] - dest_y, box[2] - dest_x, box[3] - dest_y))
+
+    # Composite the sprite on the part of the image under it
+    img.paste(Image.alpha_composite(img.crop(box), sprite), box)
+
+
+def get_seed_text_center(img_size, bbox, rotation):
+    """
+    Get the position of the center of the seed text in an image, relative to the coordinates where it is added.
+    The text is placed as if it was drawn at (0, 0) in a layer of the size of the image, the layer being rotated around
+    its center (and expanded), cropped to the size of the image and pasted at the coordinates
+    :param img_size: The size of the image
+    :param bbox: The bounding box of the text drawn at (0, 0)
+    :param rotation: The rotation of the text
+    :return: the coordinates of the center of the text
+    """
+    left, top, right, bottom = bbox
+    angle = math.radians(rotation)
+    cos, sin = math.cos(angle), math.sin(angle)
+    width, height = img_size
+    rotated_width = abs(width * cos) + abs(height * sin)
+    rotated_height = abs(width * sin) + abs(height * cos)
+    dx = (left + right) / 2 - width / 2
+    dy = (top + bottom) / 2 - height / 2
+    return rotated_width / 2 + dx * cos + dy * sin, rotated_height / 2 - dx * sin + dy * cos
+
+
+@functools.lru_cache(maxsize=None)
+def get_font(size):
+    """
+    Get the font of the seed number, loaded once for each size
+    :param size: The size of the font
+    :return: the font
+    """
+    return ImageFont.truetype("ariali.ttf", size)
 
 
 def add_img_to_pdf(c, img, x, y, size_multiplier=0.5, real_coords=False, rotation=90):
@@ -196,7 +663,16 @@ def add_img_to_pdf(c, img, x, y, size_multiplier=0.5, real_coords=False, rotatio
     coordinates are the coordinates calculated for the grid of cards images in the pdf
     :param rotation: The rotation of the image (90 by default)
     """
+    draw_img_in_pdf(c, prepare_img_for_pdf(img, rotation), x, y, size_multiplier, real_coords)
 
+
+def prepare_img_for_pdf(img, rotation=90):
+    """
+    Rotate an image, reduce it to the size it has in the pdf and put it on a white background
+    :param img: The image
+    :param rotation: The rotation of the image (90 by default)
+    :return: the image, in RGB
+    """
     # Rotate
     img = img.rotate(rotation, expand=True)
 
@@ -205,17 +681,70 @@ def add_img_to_pdf(c, img, x, y, size_multiplier=0.5, real_coords=False, rotatio
 
     # Transform transparent background to white
     white_background = Image.new("RGBA", img.size, (255, 255, 255))
-    img = Image.alpha_composite(white_background, img)
+    return Image.alpha_composite(white_background, img).convert("RGB")
+
+
+def render_card_for_pdf(card, dpi=None):
+    """
+    Rasterize a card as it is drawn in the pdf. The function only depends on the card, so the cards can be rendered
+    by a pool of workers, threads or processes
+    :param card: The card
+    :param dpi: The resolution of the card in the pdf. None to compose the card at full size and reduce it
+    :return: the image of the card, ready for draw_img_in_pdf
+    """
+    if dpi is None:
+        return prepare_img_for_pdf(create_img_from_card(card))
+
+    img = create_card_body_img_at_dpi(card, dpi)
+    if card.seed is not None:
+        add_seed_number_to_printed_card(img, card.seed, get_print_scale(dpi))
+    white_background = Image.new("RGBA", img.size, (255, 255, 255))
+    return Image.alpha_composite(white_background, img).convert("RGB")
+
+
+def add_seed_number_to_printed_card(img, seed, scale):
+    """
+    Add the seed number to a card image composed at a print resolution, where add_seed_number_to_img would put it on
+    the full size card
+    :param img: The image of the card, rotated as in the pdf, in RGBA
+    :param seed: The seed number to add
+    :param scale: The scale of the image (see get_print_scale)
+    """
+    text = f"Seed : {seed}"
+    full_width, full_height = images["Background"].size
+    center_x, center_y = get_seed_text_center((full_width, full_height),
+                                              get_font(CARD_SEED_TEXT["size"]).getbbox(text),
+                                              CARD_SEED_TEXT["rotation"])
+    center_x += CARD_SEED_TEXT["x"]
+    center_y += CARD_SEED_TEXT["y"]
+
+    # Center of the text once the card is rotated and scaled
+    draw_seed_sprite(img, text, max(1, round(CARD_SEED_TEXT["size"] * scale)), CARD_SEED_TEXT["rotation"] + 90,
+                     (center_y * scale, (full_width - center_x) * scale))
+
+
+def draw_img_in_pdf(c, img, x, y, size_multiplier=0.5, real_coords=False, size=None):
+    """
+    Draw an image prepared by prepare_img_for_pdf in a pdf
+    :param c: The canvas of the pdf
+    :param img: The image, in RGB
+    :param x: The x coordinate
+    :param y: The y coordinate
+    :param size_multiplier: The size multiplier of the image in the pdf (0.5 by default)
+    :param real_coords: If True, the x and y coordinates are the real coordinates in the pdf, if False, the x and y
+    coordinates are the coordinates calculated for the grid of cards images in the pdf
+    :param size: The (width, height) of the image in the pdf in points. By default, the size of the image multiplied
+    by the size multiplier
+    """
+    if size is None:
+        size = (img.size[0] * size_multiplier, img.size[1] * size_multiplier)
 
-    # Save the image to a temporary file, add it to the pdf and delete it
-    img.save(f"temp{x}_{y}.png")
+    # The pixels are given to the pdf in memory, they are only encoded once by reportlab
     if real_coords:
         coords = (x, y)
     else:
         coords = get_pdf_coords(x, y)
-    c.drawImage(f"temp{x}_{y}.png", coords[0], coords[1], width=img.size[0] * size_multiplier,
-                height=img.size[1] * size_multiplier)
-    os.remove(f"temp{x}_{y}.png")
+    c.drawImage(ImageReader(img), coords[0], coords[1], width=size[0], height=size[1])
 
 
 def get_hint_icon_img_coords(x, y):
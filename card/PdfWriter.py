@@ -0,0 +1,246 @@
+import math
+import zlib
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfmetrics import stringWidth, registerFont, getRegisteredFontNames
+from reportlab.pdfbase.ttfonts import TTFont
+
+
+class StreamingPdf:
+    """
+    Minimal pdf writer writing each object in the file as soon as it is complete, so that the memory used does not
+    depend on the number of pages: a page is written when it is ended, and an image is written when it is registered.
+    Images are registered once under a key and become XObjects shared by all the pages drawing them.
+    Text is drawn with a standard font of the pdf viewers, so no font is embedded.
+    """
+
+    FONT = "Helvetica-Oblique"
+
+    def __init__(self, file, pagesize=A4):
+        """
+        :param file: The path of the pdf
+        :param pagesize: The (width, height) of the pages in points
+        """
+        self.file = open(file, "wb")
+        self.file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self.pagesize = pagesize
+        # Offset of each object in the file, by object number. The catalog and the page tree are objects 1 and 2,
+        # written at the end when the pages are known
+        self.offsets = {}
+        self.next_object = 3
+        self.pages = []
+        self.images = {}
+        self.font = self.write_object(self.new_object(), f"<< /Type /Font /Subtype /Type1 /BaseFont /{self.FONT} "
+                                                         f"/Encoding /WinAnsiEncoding >>".encode())
+        self.content = None
+        self.page_images = None
+
+    def new_object(self):
+        """
+        Reserve an object number
+        :return: the object number
+        """
+        number = self.next_object
+        self.next_object += 1
+        return number
+
+    def write_object(self, number, body):
+        """
+        Write an object in the file
+        :param number: The object number
+        :param body: The content of the object
+        :return: the object number
+        """
+        self.offsets[number] = self.file.tell()
+        self.file.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+        return number
+
+    def write_stream(self, number, dictionary, data):
+        """
+        Write a stream object, compressed
+        :param number: The object number
+        :param dictionary: The entries of the stream dictionary, without Length and Filter
+        :param data: The content of the stream
+        :return: the object number
+        """
+        data = zlib.compress(data)
+        return self.write_object(number, f"<< {dictionary} /Filter /FlateDecode /Length {len(data)} >>\nstream\n"
+                                 .encode() + data + b"\nendstream")
+
+    def has_image(self, key):
+        """
+        Test if an image is registered
+        :param key: The key of the image
+        :return: True if the image is registered
+        """
+        return key in self.images
+
+    def add_image(self, key, img):
+        """
+        Register an image, written at once in the file. Registering a key again does nothing
+        :param key: The key of the image
+        :param img: The image, a PIL image. The transparency is kept
+        """
+        if key in self.images:
+            return
+        mask = ""
+        if img.mode in ("RGBA", "LA") and img.getchannel("A").getextrema()[0] < 255:
+            alpha = self.write_stream(self.new_object(), f"/Type /XObject /Subtype /Image /Width {img.width} "
+                                                         f"/Height {img.height} /ColorSpace /DeviceGray "
+                                                         f"/BitsPerComponent 8", img.getchannel("A").tobytes())
+            mask = f"/SMask {alpha} 0 R"
+        number = self.write_stream(self.new_object(), f"/Type /XObject /Subtype /Image /Width {img.width} "
+                                                      f"/Height {img.height} /ColorSpace /DeviceRGB "
+                                                      f"/BitsPerComponent 8 {mask}", img.convert("RGB").tobytes())
+        self.images[key] = (f"Im{len(self.images)}", number)
+
+    def begin_page(self):
+        """
+        Start a new page
+        """
+        self.content = []
+        self.page_images = set()
+
+    def draw_image(self, key, matrix):
+        """
+        Draw a registered image on the current page
+        :param key: The key of the image
+        :param matrix: The matrix (a, b, c, d, e, f) mapping the unit square of the image to the page
+        """
+        name, _ = self.images[key]
+        self.page_images.add(key)
+        self.content.append(f"q {' '.join(f'{v:.4f}' for v in matrix)} cm /{name} Do Q")
+
+    def draw_text(self, text, center, size, rotation=0, color=(0, 0, 0)):
+        """
+        Draw a line of text on the current page
+        :param text: The text
+        :param center: The (x, y) of the center of the text
+        :param size: The size of the font
+        :param rotation: The rotation of the text in degrees, counterclockwise
+        :param color: The (r, g, b) color of the text, between 0 and 255
+        """
+        width = stringWidth(text, self.FONT, size)
+        angle = math.radians(rotation)
+        cos, sin = math.cos(angle), math.sin(angle)
+        # The baseline starts half the width before the center, and is lowered by a third of the size
+        x = center[0] - cos * width / 2 + sin * size / 3
+        y = center[1] - sin * width / 2 - cos * size / 3
+        escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        self.content.append(f"BT {' '.join(f'{c / 255:.3f}' for c in color)} rg /F1 {size:.2f} Tf "
+                            f"{cos:.4f} {sin:.4f} {-sin:.4f} {cos:.4f} {x:.4f} {y:.4f} Tm ({escaped}) Tj ET")
+
+    def end_page(self):
+        """
+        Write the current page in the file
+        """
+        content = self.write_stream(self.new_object(), "", "\n".join(self.content).encode())
+        xobjects = " ".join(f"/{name} {number} 0 R" for name, number in sorted(self.images[key]
+                                                                             for key in self.page_images))
+        page = self.write_object(self.new_object(),
+                                 f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {self.pagesize[0]:.4f} "
+                                 f"{self.pagesize[1]:.4f}] /Contents {content} 0 R /Resources << /Font << /F1 "
+                                 f"{self.font} 0 R >> /XObject << {xobjects} >> >> >>".encode())
+        self.pages.append(page)
+        self.content = None
+        self.page_images = None
+
+    def close(self):
+        """
+        Write the page tree, the catalog and the cross-reference table, then close the file
+        """
+        if self.content is not None:
+            self.end_page()
+        kids = " ".join(f"{page} 0 R" for page in self.pages)
+        self.write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.pages)} >>".encode())
+        self.write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref = self.file.tell()
+        self.file.write(f"xref\n0 {self.next_object}\n0000000000 65535 f \n".encode())
+        for number in range(1, self.next_object):
+            self.file.write(f"{self.offsets[number]:010d} 00000 n \n".encode())
+        self.file.write(f"trailer\n<< /Size {self.next_object} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class CanvasPdf:
+    """
+    Same drawing interface as StreamingPdf over a reportlab canvas: each image is registered once as a form XObject
+    and placed with a transformation matrix, and text is drawn with a TrueType font embedded in the pdf
+    """
+
+    def __init__(self, canvas, font_file="ariali.ttf", font_name="Kronologic-Italic"):
+        """
+        :param canvas: The reportlab canvas
+        :param font_file: The TrueType font of the text
+        :param font_name: The name the font is registered with in reportlab
+        """
+        self.canvas = canvas
+        self.images = set()
+        if font_name not in getRegisteredFontNames():
+            registerFont(TTFont(font_name, font_file))
+        self.font = font_name
+
+    def has_image(self, key):
+        """
+        Test if an image is registered
+        :param key: The key of the image
+        :return: True if the image is registered
+        """
+        return key in self.images
+
+    def add_image(self, key, img):
+        """
+        Register an image as a form drawing it in the unit square. Registering a key again does nothing
+        :param key: The key of the image
+        :param img: The image, a PIL image. The transparency is kept
+        """
+        if key in self.images:
+            return
+        self.canvas.beginForm(CanvasPdf.form_name(key))
+        self.canvas.drawImage(ImageReader(img), 0, 0, width=1, height=1, mask="auto")
+        self.canvas.endForm()
+        self.images.add(key)
+
+    def draw_image(self, key, matrix):
+        """
+        Draw a registered image on the current page
+        :param key: The key of the image
+        :param matrix: The matrix (a, b, c, d, e, f) mapping the unit square of the image to the page
+        """
+        self.canvas.saveState()
+        self.canvas.transform(*matrix)
+        self.canvas.doForm(CanvasPdf.form_name(key))
+        self.canvas.restoreState()
+
+    def draw_text(self, text, center, size, rotation=0, color=(0, 0, 0)):
+        """
+        Draw a line of text on the current page
+        :param text: The text
+        :param center: The (x, y) of the center of the text
+        :param size: The size of the font
+        :param rotation: The rotation of the text in degrees, counterclockwise
+        :param color: The (r, g, b) color of the text, between 0 and 255
+        """
+        self.canvas.saveState()
+        self.canvas.translate(*center)
+        self.canvas.rotate(rotation)
+        self.canvas.setFillColorRGB(*(c / 255 for c in color))
+        self.canvas.setFont(self.font, size)
+        self.canvas.drawCentredString(0, -size / 3, text)
+        self.canvas.restoreState()
+
+    @staticmethod
+    def form_name(key):
+        """
+        Get the name of the form of an image
+        :param key: The key of the image
+        :return: the name, made of letters, digits and underscores
+        """
+        return "Img_" + "".join(c if c.isalnum() else "_" for c in str(key))
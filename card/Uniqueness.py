@@ -0,0 +1,146 @@
+from card.Card import Card, layout
+from graph.PathIndex import PathIndex
+
+
+def count_solutions(cards, characters, part=1, nb_times=6, limit=2):
+    """
+    Count the movements of the characters consistent with the cards, the start rooms given and the rules of the part.
+    The search stops as soon as limit solutions are found, so a puzzle is fair if the result is 1.
+    The cells (room, time) are bits of an integer: a path is the mask of its cells, and the search keeps the mask of
+    the cells where the cards still expect characters, so a path is tested with a single binary operation.
+    :param cards: The cards of the problem, one per room
+    :param characters: The characters of the graph, as a dictionary. Only their names and given start rooms are used
+    :param part: The part of the game, for its rules
+    :param nb_times: The number of times
+    :param limit: Number of solutions after which the search stops
+    :return: the number of solutions, at most limit
+    """
+    rooms = [card.room for card in cards]
+    board_rooms = rooms[0].board.rooms
+    index = PathIndex.get(board_rooms, nb_times=nb_times)
+
+    def cell(room_id, time):
+        return room_id * nb_times + time - 1
+
+    # Number of characters expected in each cell, from the time icons of the cards
+    cell_counts = [0] * (len(board_rooms) * nb_times)
+    character_counts = {name: [0] * len(board_rooms) for name in characters}
+    fixed_cells = {name: set() for name in characters}
+    for card in cards:
+        room_id = card.room.id
+        for t in range(1, nb_times + 1):
+            cell_counts[cell(room_id, t)] = int(card.icons[layout["Times"]["Shared"][f"Time{t}"]][1:])
+            solo = card.icons[layout["Times"]["Solo"][f"Time{t}"]]
+            if solo != "Retry":
+                fixed_cells[solo].add((room_id, t))
+        for name in characters:
+            character_counts[name][room_id] = int(card.icons[layout["Characters"]["Shared"]["Names"][name]][1:])
+            solo = card.icons[layout["Characters"]["Solo"]["Names"][name]]
+            if solo != "Retry":
+                fixed_cells[name].add((room_id, int(solo[1:])))
+    for name, character in characters.items():
+        if character.information_given:
+            fixed_cells[name].add((character[1].id, 1))
+
+    # Candidate paths of each character, as cell masks
+    empty_cells = sum(1 << i for i, count in enumerate(cell_counts) if count == 0)
+    domains = {}
+    # Whether each path is the one of the character the rules of the part single out: the ghost of the part 2 is
+    # always alone, the thief of the part 3 never goes twice in the same room
+    special = {}
+    for name in characters:
+        masks = []
+        for start in range(len(board_rooms)):
+            for path in index.paths_from(start):
+                if any(path[t - 1] != room_id for room_id, t in fixed_cells[name]):
+                    continue
+                if any(path.count(room_id) != count for room_id, count in enumerate(character_counts[name])):
+                    continue
+                cells = [cell(room_id, t) for t, room_id in enumerate(path, 1)]
+                if not _respects_rules_of_part(part, name, path, [cell_counts[c] for c in cells]):
+                    continue
+                mask = sum(1 << c for c in cells)
+                if mask & empty_cells == 0:
+                    masks.append(mask)
+                    if part == 3:
+                        special[mask] = len(set(path)) == len(path)
+                    else:
+                        special[mask] = all(cell_counts[c] == 1 for c in cells)
+        domains[name] = masks
+
+    # The most constrained characters are placed first
+    order = sorted(characters, key=lambda name: len(domains[name]))
+    remaining = list(cell_counts)
+    expected = sum(1 << i for i, count in enumerate(cell_counts) if count > 0)
+
+    def inner_count(i, available, nb_special, found):
+        if i == len(order):
+            if available == 0 and (part not in (2, 3) or nb_special == 1):
+                return found + 1
+            return found
+        # Forward checking: the cells still expected must be reachable by the characters left
+        candidates = [mask for mask in domains[order[i]] if mask & ~available == 0]
+        reachable = 0
+        for name in order[i + 1:]:
+            other = [mask for mask in domains[name] if mask & ~available == 0]
+            if not other:
+                return found
+            for mask in other:
+                reachable |= mask
+        for mask in candidates:
+            new_available = available
+            bits = mask
+            while bits:
+                c = (bits & -bits).bit_length() - 1
+                bits &= bits - 1
+                remaining[c] -= 1
+                if remaining[c] == 0:
+                    new_available &= ~(1 << c)
+            if new_available & ~reachable == 0:
+                found = inner_count(i + 1, new_available, nb_special + special[mask], found)
+            bits = mask
+            while bits:
+                c = (bits & -bits).bit_length() - 1
+                bits &= bits - 1
+                remaining[c] += 1
+            if found >= limit:
+                return found
+        return found
+
+    return inner_count(0, expected, 0, 0)
+
+
+def _respects_rules_of_part(part, name, path, counts):
+    """
+    Test if the path of a character can respect the rules of a part, knowing the number of characters in each of its
+    rooms
+    :param part: The part of the game
+    :param name: The name of the character
+    :param path: The room id of the character at each time
+    :param counts: The number of characters in the room of the character at each time
+    :return: True if the path can respect the rules, False otherwise
+    """
+    if any(count > 3 for count in counts):
+        return False
+    if part == 1 and name == "Detective":
+        return counts.count(2) == 1
+    if part == 3 and len(set(path)) == len(path):
+        # Only the thief never goes twice in the same room, and it starts alone
+        return counts[0] == 1
+    return True
+
+
+def create_unique_cards(graph, part=1, nb_tries_max=10):
+    """
+    Create the cards of a graph admitting exactly one solution. The hints of the cards are drawn again while the
+    cards are ambiguous
+    :param graph: The graph
+    :param part: The part of the game
+    :param nb_tries_max: Maximum number of draws of the cards
+    :return: the list of cards, None if no draw was unique
+    """
+    for _ in range(nb_tries_max):
+        cards = Card.create_cards(graph, part=part)
+        if count_solutions(cards, graph.characters, part=part, nb_times=graph.nb_times) == 1:
+            return cards
+    return None
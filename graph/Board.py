@@ -0,0 +1,177 @@
+from array import array
+
+
+class Board:
+    """
+    Class to represent the positions of the characters in the rooms at each time.
+    Rooms and characters are identified by small integers, given in their order of registration. The positions are
+    stored in a (character x time) matrix of room ids, -1 meaning that the character is not placed, and the number of
+    characters of each room at each time is kept up to date on every move.
+    Both matrices are flat arrays, so a move is O(1) and a snapshot of the whole board is a buffer copy.
+    Listeners (character_id, room_id, time) are called for each (room, time) whose count has changed, so that rules
+    can keep their own counters up to date (see Rule).
+    """
+
+    def __init__(self, nb_times=6):
+        self.nb_times = nb_times
+        self.rooms = []
+        self.characters = []
+        # positions[character_id * nb_times + time - 1] = room id
+        self.positions = array('b')
+        # counts[room_id * nb_times + time - 1] = number of characters
+        self.counts = array('B')
+        self.listeners = []
+
+    def add_room(self, room):
+        """
+        Register a room in the board. A room belongs to one board only: its count and its characters are read in it
+        :param room: The room, not registered in a board yet
+        :return: the id of the room. Raise a ValueError if the room belongs to another board
+        """
+        if room.board is not None:
+            raise ValueError(f"The room {room.name} already belongs to a board")
+        room.id = len(self.rooms)
+        room.board = self
+        self.rooms.append(room)
+        self.counts.extend(array('B', bytes(self.nb_times)))
+        return room.id
+
+    def add_character(self, character):
+        """
+        Register a character in the board. The character is not placed at any time
+        :param character: The character
+        :return: the id of the character
+        """
+        character.id = len(self.characters)
+        character.board = self
+        self.characters.append(character)
+        self.positions.extend(array('b', [-1]) * self.nb_times)
+        return character.id
+
+    def add_listener(self, listener):
+        """
+        Add a function called after each change of the board
+        :param listener: function (character_id, room_id, time). character_id is None when the whole board is restored
+        """
+        self.listeners.append(listener)
+
+    def room_id(self, room):
+        """
+        Get the id of a room, the room is registered if it is not in a board yet
+        :param room: The room
+        :return: the id of the room. Raise a ValueError if the room belongs to another board
+        """
+        if room.board is not self:
+            return self.add_room(room)
+        return room.id
+
+    def get_room_id(self, character_id, time):
+        """
+        Get the id of the room of a character at a specific time
+        :param character_id: The id of the character
+        :param time: The time
+        :return: the id of the room, -1 if the character is not placed
+        """
+        return self.positions[character_id * self.nb_times + time - 1]
+
+    def get_room(self, character_id, time):
+        """
+        Get the room of a character at a specific time
+        :param character_id: The id of the character
+        :param time: The time
+        :return: the room, None if the character is not placed
+        """
+        room_id = self.positions[character_id * self.nb_times + time - 1]
+        if room_id < 0:
+            return None
+        return self.rooms[room_id]
+
+    def count(self, room_id, time):
+        """
+        Get the number of characters in a room at a specific time
+        :param room_id: The id of the room
+        :param time: The time
+        :return: the number of characters
+        """
+        return self.counts[room_id * self.nb_times + time - 1]
+
+    def count_with(self, character_id, time):
+        """
+        Get the number of characters in the room of a character at a specific time
+        :param character_id: The id of the character
+        :param time: The time
+        :return: the number of characters, the character included. 0 if the character is not placed
+        """
+        room_id = self.positions[character_id * self.nb_times + time - 1]
+        if room_id < 0:
+            return 0
+        return self.counts[room_id * self.nb_times + time - 1]
+
+    def characters_in(self, room_id, time):
+        """
+        Get the characters in a room at a specific time
+        :param room_id: The id of the room
+        :param time: The time
+        :return: the list of characters, in the order of their ids
+        """
+        index = time - 1
+        characters = []
+        if self.counts[room_id * self.nb_times + index] == 0:
+            return characters
+        for character in self.characters:
+            if self.positions[character.id * self.nb_times + index] == room_id:
+                characters.append(character)
+        return characters
+
+    def place(self, character_id, room_id, time):
+        """
+        Place a character in a room at a specific time. The previous room of the character at this time is freed
+        :param character_id: The id of the character
+        :param room_id: The id of the room
+        :param time: The time
+        """
+        index = character_id * self.nb_times + time - 1
+        previous = self.positions[index]
+        if previous >= 0:
+            self.counts[previous * self.nb_times + time - 1] -= 1
+        self.positions[index] = room_id
+        self.counts[room_id * self.nb_times + time - 1] += 1
+        for listener in self.listeners:
+            if previous >= 0:
+                listener(character_id, previous, time)
+            listener(character_id, room_id, time)
+
+    def remove(self, character_id, time):
+        """
+        Remove a character from its room at a specific time
+        :param character_id: The id of the character
+        :param time: The time
+        """
+        index = character_id * self.nb_times + time - 1
+        previous = self.positions[index]
+        if previous < 0:
+            return
+        self.counts[previous * self.nb_times + time - 1] -= 1
+        self.positions[index] = -1
+        for listener in self.listeners:
+            listener(character_id, previous, time)
+
+    def snapshot(self):
+        """
+        Copy the state of the board
+        :return: a bytes buffer with the positions and the counts
+        """
+        return self.positions.tobytes() + self.counts.tobytes()
+
+    def restore(self, snapshot):
+        """
+        Restore a state of the board made by snapshot
+        :param snapshot: The bytes buffer returned by snapshot
+        """
+        nb_positions = len(self.positions)
+        self.positions = array('b', snapshot[:nb_positions])
+        self.counts = array('B', snapshot[nb_positions:])
+        for listener in self.listeners:
+            for room in self.rooms:
+                for time in range(1, self.nb_times + 1):
+                    listener(None, room.id, time)
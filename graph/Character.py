@@ -1,14 +1,25 @@
 from .Room import *
+from .Board import Board
 import random
 
+# Names of the characters, in the order of their ids
+CHARACTER_NAMES = ["Aventuriere", "Baronne", "Chauffeur", "Detective", "Journaliste", "Servante"]
+
 
 class Character:
     """
     Class to represent a character
     """
-    def __init__(self, name, start_room, nb_times=6):
+    def __init__(self, name, start_room, nb_times=6, board=None, rng=None):
         self.name = name
-        self.times = {i: NULL_ROOM for i in range(1, nb_times + 1)}
+        self.nb_times = nb_times
+        # Random generator of the random moves, the generator of the puzzle when the character is part of a graph
+        self.rng = rng if rng is not None else random.Random()
+        # Id and board given when the character is registered in a board (see Board)
+        if board is None:
+            board = Board(nb_times=nb_times)
+        board.add_character(self)
+        self.times = CharacterTimes(self)
         self.start_time = None
         self.set_start_room(start_room)
         self.information_given = False
@@ -19,9 +30,8 @@ class Character:
         :param room: The room
         :param time: The first information about time. 1 by default
         """
-        self.times[time] = room
+        self.set_room(room, time)
         self.start_time = time
-        room.characters[time].append(self)
 
     def set_room(self, room, time):
         """
@@ -29,18 +39,17 @@ class Character:
         :param room: The room
         :param time: The time
         """
-        self.times[time] = room
-        room.characters[time].append(self)
+        if room is NULL_ROOM:
+            self.remove_room(time)
+            return
+        self.board.place(self.id, self.board.room_id(room), time)
 
     def remove_room(self, time):
         """
         Remove the room of the character at a specific time
         :param time: The time
         """
-        if self.times[time] == NULL_ROOM:
-            return
-        self.times[time].characters[time].remove(self)
-        self.times[time] = NULL_ROOM
+        self.board.remove(self.id, time)
 
     def random_move(self, start_time, next_time=None):
         """
@@ -50,7 +59,7 @@ class Character:
         """
         if next_time is None:
             next_time = start_time + 1
-        self.times[next_time] = random.choice(self.times[start_time].adjacent_rooms)
+        self.times[next_time] = self.rng.choice(self.times[start_time].adjacent_rooms)
 
     def print_rooms(self):
         """
@@ -70,22 +79,24 @@ class Character:
 
 
     @staticmethod
-    def create_characters(start_rooms=None, nb_times=6):
+    def create_characters(start_rooms=None, nb_times=6, board=None, rng=None):
         """
         Create the characters of the game
         :param start_rooms: The start rooms of the characters. NULL_ROOM by default
         :param nb_times: The number of times of the game
+        :param board: The board where the characters are placed. A new board by default
+        :param rng: The random generator of the characters. A new one by default
         :return: a dictionary of characters
         """
         if start_rooms is None:
             start_rooms = [NULL_ROOM for _ in range(6)]
+        if board is None:
+            board = Board(nb_times=nb_times)
+        if rng is None:
+            rng = random.Random()
         characters = {}
-        characters["Aventuriere"] = Character("Aventuriere", start_rooms[0], nb_times=nb_times)
-        characters["Baronne"] = Character("Baronne", start_rooms[1], nb_times=nb_times)
-        characters["Chauffeur"] = Character("Chauffeur", start_rooms[2], nb_times=nb_times)
-        characters["Detective"] = Character("Detective", start_rooms[3], nb_times=nb_times)
-        characters["Journaliste"] = Character("Journaliste", start_rooms[4], nb_times=nb_times)
-        characters["Servante"] = Character("Servante", start_rooms[5], nb_times=nb_times)
+        for name, start_room in zip(CHARACTER_NAMES, start_rooms):
+            characters[name] = Character(name, start_room, nb_times=nb_times, board=board, rng=rng)
         return characters
 
     @staticmethod
@@ -98,4 +109,36 @@ class Character:
         """
         for character in characters.values():
             character.random_move(time)
-        return characters
\ No newline at end of file
+        return characters
+
+
+class CharacterTimes:
+    """
+    View of the rooms of a character at each time: character.times[time] is the room, NULL_ROOM if not placed
+    """
+    def __init__(self, character):
+        self.character = character
+
+    def __getitem__(self, time):
+        room = self.character.board.get_room(self.character.id, time)
+        if room is None:
+            return NULL_ROOM
+        return room
+
+    def __setitem__(self, time, room):
+        self.character.set_room(room, time)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return self.character.nb_times
+
+    def keys(self):
+        return range(1, self.character.nb_times + 1)
+
+    def values(self):
+        return [self[time] for time in self.keys()]
+
+    def items(self):
+        return [(time, self[time]) for time in self.keys()]
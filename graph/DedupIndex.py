@@ -0,0 +1,54 @@
+import os
+import sqlite3
+from contextlib import closing
+
+# File of the index, created at the first use
+DEDUP_INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dedup.sqlite")
+
+
+class DedupIndex:
+    """
+    Index on disk of the canonical hashes of the generated puzzles (see Symmetry.canonical_hash), by part and number
+    of information given, to detect the puzzles equivalent to a puzzle already generated. The first seed of each
+    hash is kept, so the index survives restarts and can be shared by several runs
+    """
+
+    def __init__(self, file=DEDUP_INDEX_FILE):
+        """
+        :param file: The path of the SQLite file
+        """
+        self.file = file
+        with closing(self.connect()) as connection, connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS canonical ("
+                               "part INTEGER, nb_information INTEGER, hash INTEGER, seed INTEGER, "
+                               "PRIMARY KEY (part, nb_information, hash))")
+
+    def connect(self):
+        """
+        Open a connection to the file, one for each operation
+        :return: a sqlite3 connection
+        """
+        return sqlite3.connect(self.file, timeout=30)
+
+    def add(self, part, given_information, canonical_hash, seed):
+        """
+        Add the hash of a puzzle, unless an equivalent puzzle is already in the index
+        :param part: The part of the game
+        :param given_information: Number of information given about character's position in time 1
+        :param canonical_hash: The canonical hash of the puzzle
+        :param seed: The seed of the puzzle, or the identifier of a puzzle of the vectorized generation
+        :return: the seed of the equivalent puzzle already in the index, None if the puzzle is new or has been added
+        before with the same seed
+        """
+        with closing(self.connect()) as connection, connection:
+            cursor = connection.execute("INSERT OR IGNORE INTO canonical VALUES (?, ?, ?, ?)",
+                                        (part, given_information, canonical_hash, seed))
+            if cursor.rowcount:
+                return None
+            first_seed = connection.execute("SELECT seed FROM canonical WHERE part = ? AND nb_information = ? AND "
+                                            "hash = ?", (part, given_information, canonical_hash)).fetchone()[0]
+        return None if first_seed == seed else first_seed
+
+    def __len__(self):
+        with closing(self.connect()) as connection:
+            return connection.execute("SELECT COUNT(*) FROM canonical").fetchone()[0]
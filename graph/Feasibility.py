@@ -0,0 +1,80 @@
+# Masks of the rooms reachable at each time from each room, by (adjacency of the rooms, number of times)
+_reachable_tables = {}
+
+
+def reachable_from(rooms, nb_times=6):
+    """
+    Get the rooms reachable at each time from each room, moving to an adjacent room at each time. The result is
+    computed once for each map
+    :param rooms: The rooms of the board, in the order of their ids
+    :param nb_times: The number of times
+    :return: a list by room id of the masks of the reachable room ids at each time, time 1 first
+    """
+    adjacency = tuple(sum(1 << adjacent.id for adjacent in room.adjacent_rooms) for room in rooms)
+    key = (adjacency, nb_times)
+    if key not in _reachable_tables:
+        table = []
+        for room_id in range(len(adjacency)):
+            masks = [1 << room_id]
+            for _ in range(1, nb_times):
+                masks.append(adjacent_rooms_mask(masks[-1], adjacency))
+            table.append(masks)
+        _reachable_tables[key] = table
+    return _reachable_tables[key]
+
+
+def adjacent_rooms_mask(mask, adjacency):
+    """
+    Get the rooms adjacent to a set of rooms
+    :param mask: The mask of the room ids
+    :param adjacency: The mask of the adjacent room ids of each room
+    :return: the mask of the adjacent room ids
+    """
+    result = 0
+    for room_id, adjacent in enumerate(adjacency):
+        if mask >> room_id & 1:
+            result |= adjacent
+    return result
+
+
+def reachable_rooms(graph, nb_times=6):
+    """
+    Get the rooms each character can reach at each time from its start room, moving to an adjacent room at each time
+    :param graph: The graph with the characters in their start rooms
+    :param nb_times: The number of times
+    :return: a dictionary character id -> list of the masks of the reachable room ids at each time, time 1 first
+    """
+    table = reachable_from(graph.board.rooms, nb_times)
+    return {character.id: table[character[1].id] for character in graph.characters.values()}
+
+
+def can_meet(reachable, character, others):
+    """
+    Test if a character can be in the same room as one of other characters at some time
+    :param reachable: The reachable rooms returned by reachable_rooms
+    :param character: The character
+    :param others: The other characters
+    :return: True if they can meet, False if no time and no room is reachable by both
+    """
+    return any(masks[t] & reachable[character.id][t]
+               for other in others if other is not character
+               for masks in [reachable[other.id]]
+               for t in range(len(masks)))
+
+
+def is_feasible(graph, rules, nb_times=6):
+    """
+    Test quickly if the rules can be respected from the start rooms of the characters, before searching the movements.
+    Each rule with a feasible function tests a necessary condition from the start rooms and from the rooms the
+    characters can reach at each time (see Rule). The test never rejects a start configuration having a solution, but
+    may accept one without solution
+    :param graph: The graph with the characters in their start rooms
+    :param rules: The rules
+    :param nb_times: The number of times
+    :return: False if the rules can't be respected, True otherwise
+    """
+    feasible_functions = [rule.feasible for rule in rules if rule.feasible is not None]
+    if not feasible_functions:
+        return True
+    reachable = reachable_rooms(graph, nb_times)
+    return all(feasible(reachable) for feasible in feasible_functions)
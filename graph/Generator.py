@@ -0,0 +1,91 @@
+import math
+import random
+
+from graph.Graph import Graph
+from graph.Room import Room
+from graph.Rule import Rule, nb_max_characters_in_starting_room
+
+# Version of the generation, to increase when a seed gives another puzzle, so that the cached puzzles are not used
+GENERATOR_VERSION = 2
+# First identifier of the problems no seed gives again. The identifiers are above the ranges of the seeds, so that
+# they are never taken for seeds (see part_from_seed)
+PROBLEM_ID_MIN = 10 ** 9
+
+
+def generate_problem(part, given_information, seed=None, stats=None, profiler=None, rng=None, start_statistics=None):
+    """
+    Generate one problem from a random start configuration
+    :param part: The part of the game
+    :param given_information: Number of information given about character's position in time 1
+    :param seed: The seed of the game, stored in the graph
+    :param stats: Optional dictionary where the counters of the search are added (see Graph.movements)
+    :param profiler: Optional SearchProfiler collecting the rule evaluations and the backtracks of the search
+    :param rng: The random generator of the puzzle. A generator seeded with the seed by default
+    :param start_statistics: Optional StartStatistics drawing the start configuration in proportion to its rate of
+    success. A configuration without solution is recorded in it. When the statistics draw the start rooms, the seed
+    doesn't give the problem again, so the graph has no seed
+    :return: the graph with the movements of the characters. Raise an exception if no solution has been found
+    """
+    # Creation of the graph
+    rooms = Room.create_rooms()
+    nb_max = nb_max_characters_in_starting_room(part)
+    rng = rng if rng is not None else random.Random(seed)
+    # The parts 1 and 2 keep one character per start room, so that their seeds still give the same puzzles
+    nb_start_max = nb_max if part == 3 else 1
+    if start_statistics is not None and nb_start_max > 1:
+        start_rooms = start_statistics.random_start_rooms(part, rooms.values(), rng, nb_characters_max=nb_start_max)
+        seed = None
+    else:
+        start_rooms = Graph.random_start_rooms(rooms.values(), nb_characters_max=nb_start_max, rng=rng)
+    g = Graph(nb_times=6, given_information=given_information, rooms=rooms, start_rooms=start_rooms, seed=seed,
+              nb_max_in_starting_room=nb_max, rng=rng)
+
+    # Rules
+    rules = Rule.rules_for_part(part, g)
+
+    # Generate movements
+    try:
+        g.movements(rules=rules, nb_times=6, stats=stats, profiler=profiler)
+    except Exception:
+        if start_statistics is not None:
+            start_statistics.record(part, g.board.rooms, start_room_ids(g), False)
+        raise
+    return g
+
+
+def start_room_ids(graph):
+    """
+    Get the start configuration of a graph
+    :param graph: The graph
+    :return: the start room id of each character, in the order of the characters
+    """
+    return [character[1].id for character in graph.characters.values()]
+
+
+def part_from_seed(seed):
+    """
+    Get the part of the game of a seed
+    :param seed: The seed
+    :return: The part of the game. Raise a ValueError if the seed is wrong
+    """
+    part = math.floor(seed / 10000000)
+    if part not in [1, 2, 3]:
+        raise ValueError("Wrong seed")
+    return part
+
+
+def random_problem_id():
+    """
+    Draw the identifier of a problem no seed gives again
+    :return: the identifier, at least PROBLEM_ID_MIN
+    """
+    return random.SystemRandom().randrange(PROBLEM_ID_MIN, 2 ** 62)
+
+
+def random_seed(part):
+    """
+    Draw a random seed of a part of the game
+    :param part: The part of the game
+    :return: the seed
+    """
+    return random.randint(0, 9999999) + 10000000 * part
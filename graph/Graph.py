@@ -1,113 +1,104 @@
 from graph.Room import Room
 from graph.Character import Character
+from graph.Board import Board
 import random
 
-from graph.Rule import RuleTag, Rule
+from graph.Solver import Solver
+from graph.Feasibility import is_feasible
+from graph.PathIndex import PathIndex
 
 
 class Graph:
-    def __init__(self, nb_times=6, rooms=None, start_rooms=None, seed=None, given_information=0, nb_max_in_starting_room=1):
+    def __init__(self, nb_times=6, rooms=None, start_rooms=None, seed=None, given_information=0, nb_max_in_starting_room=1,
+                 rng=None):
+        # Random generator of the puzzle: every random choice of the graph, its rules, its solver and its cards is drawn
+        # from it, so that puzzles can be generated concurrently and a seed always gives the same puzzle
+        self.rng = rng if rng is not None else random.Random(seed)
         if rooms is None:
             self.rooms = Room.create_rooms()
         else:
             self.rooms = rooms
         self.nb_times = nb_times
+
+        # Rooms are registered first so that their ids follow the order of the dictionary
+        self.board = Board(nb_times=nb_times)
+        for room in self.rooms.values():
+            self.board.add_room(room)
+
         if start_rooms is None:
-            start_rooms = Graph.random_start_rooms(self.rooms.values())
+            start_rooms = Graph.random_start_rooms(self.rooms.values(), rng=self.rng)
         else:
             start_rooms = start_rooms
 
-        self.characters = Character.create_characters(nb_times=nb_times, start_rooms=start_rooms)
+        self.characters = Character.create_characters(nb_times=nb_times, start_rooms=start_rooms, board=self.board,
+                                                      rng=self.rng)
 
         # Give starting information to some characters
         self.given_information = given_information
-        state = random.getstate() # used to not change the seed because of the nb information given
+        # Drawn from a copy of the generator, so that the movements don't depend on the number of information given
+        information_rng = random.Random()
+        information_rng.setstate(self.rng.getstate())
         characters_copy = list(self.characters.keys())
         for i in range(given_information):
-            character_given = random.choice(characters_copy)
+            character_given = information_rng.choice(characters_copy)
             self.characters[character_given].information_given = True
             characters_copy.remove(character_given)
-        random.setstate(state) # put the random state back to what it was before
 
         self.seed = seed
 
 
     def random_movements(self, time=6):
         """
-        Generate random movements for the characters
+        Generate random movements for the characters, by sampling a path of the index for each of them
         No rules are respected
         :param time:
         """
-        for i in range(1, time):
-            Character.random_move_characters(self.characters, i)
+        index = PathIndex.get(self.board.rooms, nb_times=time)
+        for character in self.characters.values():
+            path = self.rng.choice(index.paths_from(character[1].id))
+            for t in range(2, time + 1):
+                character.set_room(self.board.rooms[path[t - 1]], t)
 
     @staticmethod
-    def random_start_rooms(rooms, nb_characters_max=1):
+    def random_start_rooms(rooms, nb_characters_max=1, rng=random):
         """
         Generate 6 random start rooms
         :param nb_characters_max: The maximum number of characters in a starting room
         :param rooms: the list of rooms
+        :param rng: The random generator. The random module by default
         :return: the list of start rooms
         """
         start_rooms = []
         available_rooms = {room: nb_characters_max for room in list(rooms)}
         for i in range(6):
-            room = random.choice(list(available_rooms.keys()))
+            room = rng.choice(list(available_rooms.keys()))
             start_rooms.append(room)
             available_rooms[room] -= 1
             if available_rooms[room] == 0:
                 available_rooms.pop(room)
         return start_rooms
 
-    def movements(self, rules: list = None, nb_times=6, nb_tests_max=5000):
+    def movements(self, rules: list = None, nb_times=6, nb_tests_max=20000, stats=None, profiler=None):
         """
-        Generate the movements of the characters
+        Generate the movements of the characters with a backtracking search (see Solver). Start rooms from which the
+        rules can't be respected are rejected before the search (see Feasibility)
         :param rules: Rules the movements must respect
         :param nb_times: Number of times
-        :param nb_tests_max: Maximum number of tests before giving up
+        :param nb_tests_max: Maximum number of placements tried before giving up
+        :param stats: Optional dictionary where the number of paths tried is added under "paths_tried", and the number
+        of start rooms rejected before the search under "infeasible_starts"
+        :param profiler: Optional SearchProfiler collecting the rule evaluations and the backtracks of the search
         :return: None
         """
-        if rules is None:
-            rules = []
-
-        def inner_movements(time):
-            if time == nb_times:
-                if Rule.test_rules(rules, RuleTag.END):
-                    return True
-                else:
-                    return False
-            nb_tests = 0
-            error = False
-            while nb_tests < nb_tests_max:
-                for character in self.characters.values():
-                    available_moves = character.times[time].adjacent_rooms.copy()
-                    while True:
-                        move = random.choice(available_moves)
-                        available_moves.remove(move)
-                        character.set_room(move, time + 1)
-                        if Rule.test_rules(rules, RuleTag.MOVEMENT):
-                            break
-                        else:
-                            character.remove_room(time + 1)
-                        if len(available_moves) == 0:
-                            error = True
-                            break
-                    if error:
-                        break
-                if not error and Rule.test_rules(rules, RuleTag.AFTER_A_TIME) and inner_movements(time + 1):
-                    return True
-                else:
-                    nb_tests += 1
-                    error = False
-                    for character in self.characters.values():
-                        character.remove_room(time + 1)
-
-            return False
-
-        solution_found = inner_movements(1)
-        if solution_found:
-            return
-        else:
+        if rules and not is_feasible(self, rules, nb_times=nb_times):
+            if stats is not None:
+                stats["infeasible_starts"] = stats.get("infeasible_starts", 0) + 1
+            raise Exception("No solution found")
+        solver = Solver(self, rules=rules, nb_times=nb_times, nb_tests_max=nb_tests_max, profiler=profiler)
+        solution_found = solver.solve()
+        if stats is not None:
+            stats["paths_tried"] = stats.get("paths_tried", 0) + solver.nb_tests
+        if not solution_found:
             raise Exception("No solution found")
 
     def show_matrix(self):
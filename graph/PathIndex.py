@@ -0,0 +1,143 @@
+import os
+import struct
+from array import array
+
+# File where the index is persisted, built at the first use
+PATH_INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "paths.bin")
+MAGIC = b"KPI1"
+
+
+class PathIndex:
+    """
+    Index of all the legal paths of a character: a path is the list of the rooms of the character at each time, where
+    each room is adjacent to the previous one. The paths are stored as room ids and keyed by start room.
+    The manor and the number of times are fixed, so the index is small and can be built once and persisted. The file
+    contains the adjacency matrix it was built from, so that an index of another manor is never used.
+    """
+
+    def __init__(self, adjacency, nb_times, paths):
+        """
+        :param adjacency: list of the adjacent room ids of each room id
+        :param nb_times: The number of times of a path
+        :param paths: list of the paths of each start room id. A path is a tuple of room ids
+        """
+        self.adjacency = adjacency
+        self.nb_times = nb_times
+        self.paths = paths
+
+    def paths_from(self, room_id):
+        """
+        Get the paths starting in a room
+        :param room_id: The id of the start room
+        :return: the list of paths, each path is a tuple of room ids
+        """
+        return self.paths[room_id]
+
+    def __len__(self):
+        return sum(len(paths) for paths in self.paths)
+
+    @staticmethod
+    def adjacency_of(rooms):
+        """
+        Get the adjacency of rooms registered in a board
+        :param rooms: The rooms, in the order of their ids
+        :return: list of the adjacent room ids of each room id
+        """
+        return [[adjacent.id for adjacent in room.adjacent_rooms] for room in rooms]
+
+    @staticmethod
+    def build(adjacency, nb_times=6):
+        """
+        Enumerate all the paths of the manor
+        :param adjacency: list of the adjacent room ids of each room id
+        :param nb_times: The number of times of a path
+        :return: a PathIndex
+        """
+        # Adjacent rooms are sorted so that a built index and a loaded one give the paths in the same order
+        paths = []
+        for start in range(len(adjacency)):
+            room_paths = [(start,)]
+            for _ in range(nb_times - 1):
+                room_paths = [path + (room,) for path in room_paths for room in sorted(adjacency[path[-1]])]
+            paths.append(room_paths)
+        return PathIndex(adjacency, nb_times, paths)
+
+    def save(self, file=PATH_INDEX_FILE):
+        """
+        Save the index in a binary file: a header, the adjacency matrix, the number of paths of each start room and
+        the paths, one byte per room id
+        :param file: The path of the file
+        """
+        nb_rooms = len(self.adjacency)
+        matrix = bytes(int(j in self.adjacency[i]) for i in range(nb_rooms) for j in range(nb_rooms))
+        counts = array('H', [len(paths) for paths in self.paths])
+        data = bytes(room for paths in self.paths for path in paths for room in path)
+        # Written to a temporary file first so that another process never reads a partial index
+        temp_file = f"{file}.{os.getpid()}.tmp"
+        with open(temp_file, "wb") as f:
+            f.write(MAGIC + struct.pack("<BB", nb_rooms, self.nb_times))
+            f.write(matrix)
+            f.write(counts.tobytes())
+            f.write(data)
+        os.replace(temp_file, file)
+
+    @staticmethod
+    def load(file=PATH_INDEX_FILE):
+        """
+        Load an index saved with save
+        :param file: The path of the file
+        :return: a PathIndex. Raise a ValueError if the file is not a path index
+        """
+        with open(file, "rb") as f:
+            content = f.read()
+        if content[:4] != MAGIC:
+            raise ValueError(f"{file} is not a path index")
+        nb_rooms, nb_times = struct.unpack("<BB", content[4:6])
+        offset = 6
+        matrix = content[offset:offset + nb_rooms * nb_rooms]
+        offset += nb_rooms * nb_rooms
+        adjacency = [[j for j in range(nb_rooms) if matrix[i * nb_rooms + j]] for i in range(nb_rooms)]
+        counts = array('H')
+        counts.frombytes(content[offset:offset + 2 * nb_rooms])
+        offset += 2 * nb_rooms
+        paths = []
+        for count in counts:
+            end = offset + count * nb_times
+            paths.append([tuple(content[i:i + nb_times]) for i in range(offset, end, nb_times)])
+            offset = end
+        return PathIndex(adjacency, nb_times, paths)
+
+    @staticmethod
+    def get(rooms, nb_times=6, file=PATH_INDEX_FILE):
+        """
+        Get the index of rooms: it is loaded from the file if it matches the rooms, else it is built and saved.
+        The index is kept in memory for the next calls
+        :param rooms: The rooms, registered in a board, in the order of their ids
+        :param nb_times: The number of times of a path
+        :param file: The path of the file
+        :return: a PathIndex
+        """
+        adjacency = PathIndex.adjacency_of(rooms)
+        key = (tuple(tuple(adjacent) for adjacent in adjacency), nb_times)
+        if key in _loaded_indexes:
+            return _loaded_indexes[key]
+
+        index = None
+        if os.path.exists(file):
+            try:
+                index = PathIndex.load(file)
+            except (ValueError, struct.error):
+                index = None
+        if index is None or index.nb_times != nb_times or \
+                [sorted(adjacent) for adjacent in index.adjacency] != [sorted(adjacent) for adjacent in adjacency]:
+            index = PathIndex.build(adjacency, nb_times)
+            try:
+                index.save(file)
+            except OSError:
+                pass
+        _loaded_indexes[key] = index
+        return index
+
+
+# Indexes already loaded, by (adjacency, nb_times)
+_loaded_indexes = {}
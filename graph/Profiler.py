@@ -0,0 +1,150 @@
+import time as clock
+
+
+class RuleStats:
+    """
+    Counters of the evaluations of one rule
+    """
+
+    def __init__(self, tag, label=None, search=0):
+        """
+        :param tag: The RuleTag of the rule
+        :param label: The debug_id of the rule, shown in the reports
+        :param search: The index of the search where the rule was first evaluated
+        """
+        self.tag = tag
+        self.label = label
+        self.search = search
+        self.evaluations = 0
+        self.rejections = 0
+        self.duration = 0.0
+
+
+class SearchProfiler:
+    """
+    Opt-in instrumentation of the movement search. A profiler given to Graph.movements (or to the generator) collects:
+    - for each rule, the number of evaluations and rejections and the time spent, the pruning tests of the solver
+      (can_place) included. The rules are told apart by the search where they are evaluated and by their debug_id
+    - for each search, the paths tried, the backtracks at each depth of the search and the searches stopped by the
+      nb_tests_max budget
+    The solver only uses the instrumented functions when a profiler is given, so a search without profiler is not
+    slowed down.
+    """
+
+    def __init__(self, callback=None):
+        """
+        :param callback: Optional function (profiler, solved) called at the end of each search
+        """
+        self.callback = callback
+        self.rules = {}
+        self.searches = 0
+        self.solved = 0
+        self.placements = 0
+        self.backtracks = {}
+        self.budgets_exhausted = 0
+
+    def stats_of(self, rule):
+        """
+        Get the counters of a rule, created at its first evaluation
+        :param rule: The rule
+        :return: the RuleStats of the rule
+        """
+        # The rules are keyed by themselves: two rules with the same debug_id, or without one, are counted apart
+        if rule not in self.rules:
+            self.rules[rule] = RuleStats(rule.test_time, label=rule.debug_id, search=self.searches)
+        return self.rules[rule]
+
+    def test_rules(self, rules, tag):
+        """
+        Instrumented version of Rule.test_rules
+        :param rules: A list of rules
+        :param tag: The tag of the rules to test
+        :return: True if all the rules are respected, False otherwise
+        """
+        for rule in rules:
+            if rule.test_time == tag:
+                stats = self.stats_of(rule)
+                start = clock.perf_counter()
+                respected = rule.is_respected()
+                stats.duration += clock.perf_counter() - start
+                stats.evaluations += 1
+                if not respected:
+                    stats.rejections += 1
+                    return False
+        return True
+
+    def wrap_can_place(self, rule):
+        """
+        Get an instrumented version of the pruning function of a rule
+        :param rule: The rule, with a can_place function
+        :return: a function (character, room, time) -> bool
+        """
+        stats = self.stats_of(rule)
+        can_place = rule.can_place
+
+        def inner(character, room, time):
+            start = clock.perf_counter()
+            allowed = can_place(character, room, time)
+            stats.duration += clock.perf_counter() - start
+            stats.evaluations += 1
+            if not allowed:
+                stats.rejections += 1
+            return allowed
+
+        return inner
+
+    def on_placement(self):
+        """
+        Count a path tried by the solver
+        """
+        self.placements += 1
+
+    def on_backtrack(self, depth):
+        """
+        Count a path removed by the solver
+        :param depth: The index of the character whose path is removed
+        """
+        self.backtracks[depth] = self.backtracks.get(depth, 0) + 1
+
+    def on_search_end(self, solved, budget_exhausted):
+        """
+        Count a search
+        :param solved: True if the search found a solution
+        :param budget_exhausted: True if the search was stopped by the nb_tests_max budget
+        """
+        self.searches += 1
+        self.solved += solved
+        self.budgets_exhausted += budget_exhausted
+        if self.callback is not None:
+            self.callback(self, solved)
+
+    def report(self):
+        """
+        Get the collected data
+        :return: a dictionary, serializable in json
+        """
+        return {
+            "searches": self.searches,
+            "solved": self.solved,
+            "budgets_exhausted": self.budgets_exhausted,
+            "placements": self.placements,
+            "backtracks": {str(depth): count for depth, count in sorted(self.backtracks.items())},
+            "rules": [{"search": stats.search, "rule": stats.label, "tag": stats.tag.name,
+                       "evaluations": stats.evaluations, "rejections": stats.rejections, "duration": stats.duration}
+                      for stats in self.rules.values()],
+        }
+
+    def show(self):
+        """
+        Print the collected data
+        """
+        print(f"Searches : {self.searches}, solved : {self.solved}, budgets exhausted : {self.budgets_exhausted}")
+        print(f"Paths tried : {self.placements}")
+        print("Backtracks by depth : " +
+              ", ".join(f"{depth}: {count}" for depth, count in sorted(self.backtracks.items())))
+        print(f"{'Search'.ljust(8)}{'Rule'.ljust(6)}{'Tag'.ljust(14)}{'Evaluations'.rjust(12)}"
+              f"{'Rejections'.rjust(12)}{'Time (ms)'.rjust(12)}")
+        # The rules of a search are shown in the order of their first evaluation
+        for stats in sorted(self.rules.values(), key=lambda stats: stats.search):
+            print(f"{str(stats.search).ljust(8)}{str(stats.label).ljust(6)}{stats.tag.name.ljust(14)}"
+                  f"{stats.evaluations:12}{stats.rejections:12}{stats.duration * 1000:12.2f}")
@@ -6,7 +6,11 @@ class Room:
             adjacent_rooms = []
         self.name = name
         self.adjacent_rooms = adjacent_rooms
-        self.characters = {time: [] for time in range(1, nb_times + 1)}
+        self.nb_times = nb_times
+        # Id and board given when the room is registered in a board (see Board)
+        self.id = None
+        self.board = None
+        self.characters = RoomCharacters(self)
 
     def add_character(self, character, time):
         """
@@ -14,8 +18,7 @@ class Room:
         :param character: The character to add
         :param time: The time to add the character
         """
-        self.characters[time].append(character)
-        character.times[time] = self
+        character.set_room(self, time)
 
     def remove_character(self, character, time):
         """
@@ -23,8 +26,17 @@ class Room:
         :param character: character to remove
         :param time: time to remove the character
         """
-        self.characters[time].remove(character)
-        character.times[time] = NULL_ROOM
+        character.remove_room(time)
+
+    def count(self, time):
+        """
+        Get the number of characters in the room at a specific time
+        :param time: The time
+        :return: the number of characters
+        """
+        if self.board is None:
+            return 0
+        return self.board.count(self.id, time)
 
     def add_adjacent_rooms(self, rooms: list):
         """
@@ -71,5 +83,33 @@ class Room:
         return rooms
 
 
+class RoomCharacters:
+    """
+    Read-only view of the characters in a room at each time: room.characters[time] is the list of characters
+    """
+    def __init__(self, room):
+        self.room = room
+
+    def __getitem__(self, time):
+        if self.room.board is None:
+            return []
+        return self.room.board.characters_in(self.room.id, time)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return self.room.nb_times
+
+    def keys(self):
+        return range(1, self.room.nb_times + 1)
+
+    def values(self):
+        return [self[time] for time in self.keys()]
+
+    def items(self):
+        return [(time, self[time]) for time in self.keys()]
+
+
 # Null room used to define a room not yet assigned to a character
 NULL_ROOM = Room("Null Room")
@@ -1,6 +1,5 @@
-import random
-
 from graph.Character import Character
+from graph.Feasibility import can_meet
 from enum import Enum
 
 
@@ -19,14 +18,42 @@ class Rule:
     Class to represent a rule
     """
 
-    def __init__(self, lambda_function=None, test_at=RuleTag.MOVEMENT, debug_id=None):
+    def __init__(self, lambda_function=None, test_at=RuleTag.MOVEMENT, debug_id=None, can_place=None,
+                 incremental_function=None, on_move=None, board=None, feasible=None, path_filter=None):
         self.lambda_function = lambda_function
         self.test_time = test_at
         self.debug_id = debug_id
+        # Optional function (character, room, time) -> bool used by the solver to prune the candidate rooms
+        # before a placement. A rule with this function does not need to be tested after each movement. The result must
+        # only depend on the characters in the room at the time
+        self.can_place = can_place
+        # Optional incremental evaluation: on_move (character_id, room_id, time) updates the counters of the rule after
+        # each change of the board, and incremental_function tests the rule from these counters in O(1)
+        self.incremental_function = incremental_function
+        self.on_move = on_move
+        if on_move is not None and board is not None:
+            board.add_listener(on_move)
+        # Optional function (reachable) -> bool testing a necessary condition of the rule before the search, from the
+        # start rooms and from the rooms each character can reach at each time (see Feasibility.reachable_rooms). It
+        # must never return False when the rule can be respected
+        self.feasible = feasible
+        # Optional function (character, path) -> bool telling if a whole path of a character, a tuple of room ids, can
+        # respect the rule whatever the paths of the other characters. The solver removes the other paths from the
+        # candidate paths of the character once, before the search
+        self.path_filter = path_filter
 
     def is_respected(self):
         """
-        Test if the rule is respected
+        Test if the rule is respected. The incremental evaluation is used if the rule has one
+        :return: True if the rule is respected, False otherwise
+        """
+        if self.incremental_function is not None:
+            return self.incremental_function()
+        return self.lambda_function()
+
+    def is_respected_from_scratch(self):
+        """
+        Test if the rule is respected by evaluating it on the whole board
         :return: True if the rule is respected, False otherwise
         """
         return self.lambda_function()
@@ -34,15 +61,17 @@ class Rule:
     @staticmethod
     def rules_for_part(part, graph):
         """
-        Create the rules for the part 1 or 2 of Kronologic : The poisoning or The ghost
+        Create the rules for the part 1, 2 or 3 of Kronologic : The poisoning, The ghost or The pearls
         :param graph: The graph
-        :param part: The part of the game. 1 or 2
+        :param part: The part of the game. 1, 2 or 3
         :return: a list of rules
         """
         if part == 1:
             return Rule.rules_for_part_1(graph)
         elif part == 2:
             return Rule.rules_for_part_2(graph)
+        elif part == 3:
+            return Rule.rules_for_part_3(graph)
         else:
             return []
 
@@ -53,9 +82,9 @@ class Rule:
         :param graph: The graph
         :return: a list of rules
         """
-        rule1 = Rule.create_exactly_one_time_with_two_people(graph.characters["Detective"])
-        rule2 = Rule.create_exactly_one_time_with_two_people_after_time(graph.characters["Detective"])
-        rule3 = Rule.create_no_more_than_3_in_a_room(list(graph.characters.values()))
+        rule1 = Rule.create_exactly_one_time_with_two_people(graph.characters["Detective"], debug_id=1)
+        rule2 = Rule.create_exactly_one_time_with_two_people_after_time(graph.characters["Detective"], debug_id=2)
+        rule3 = Rule.create_no_more_than_3_in_a_room(list(graph.characters.values()), debug_id=3)
         return [rule1, rule2, rule3]
 
     @staticmethod
@@ -66,17 +95,40 @@ class Rule:
         :param print_ghost: If True, print the ghost's name. False by default
         :return: a list of rules
         """
-        ghost = random.choice(list(graph.characters.values()))
+        ghost = graph.rng.choice(list(graph.characters.values()))
         # Rule 1: The detective is always alone
-        rule1 = Rule.create_is_always_alone(ghost)
+        rule1 = Rule.create_is_always_alone(ghost, debug_id=1)
         # Rule 2: Everyone is at least one time not alone (except the detective)
         rule2 = Rule.create_everyone_at_least_one_time_not_alone(
             [character for character in graph.characters.values() if
-             character.name != ghost.name])
-        rule3 = Rule.create_no_more_than_3_in_a_room(list(graph.characters.values()))
+             character.name != ghost.name], debug_id=2)
+        rule3 = Rule.create_no_more_than_3_in_a_room(list(graph.characters.values()), debug_id=3)
 
         return [rule1, rule2, rule3]
 
+    @staticmethod
+    def rules_for_part_3(graph, print_thief=False):
+        """
+        Create the rules for the part 3 of Kronologic : The pearls
+        :param graph: The graph
+        :param print_thief: If True, print the thief's name. False by default
+        :return: a list of rules
+        """
+        thief = graph.rng.choice(list(graph.characters.values()))
+        others = [character for character in graph.characters.values() if character is not thief]
+        # Rule 1: The thief starts alone
+        rule1 = Rule.create_different_start_rooms_for(thief, debug_id=1)
+        # Rule 2: The thief is never twice in the same room
+        rule2 = Rule.create_never_twice_in_the_same_room(thief, debug_id=2)
+        # Rule 3: Everyone else is at least twice in the same room
+        rule3 = Rule.create_everyone_at_least_twice_in_the_same_room(others, debug_id=3)
+        # Rule 4: No more than 3 characters in a room
+        rule4 = Rule.create_no_more_than_3_in_a_room(list(graph.characters.values()), debug_id=4)
+        if print_thief:
+            print(f"The thief is {thief.name}")
+
+        return [rule1, rule2, rule3, rule4]
+
     @staticmethod
     def test_rules(rules, tag):
         """
@@ -95,82 +147,209 @@ class Rule:
         #return all(rule.is_respected() for rule in rules if rule.test_time == tag)
 
     @staticmethod
-    def create_is_always_alone(character: Character):
+    def create_is_always_alone(character: Character, debug_id=None):
         """
         Create a rule to test if a character is always alone
         :param character: The character that must be alone
+        :param debug_id: The identifier of the rule in the debug and profiling outputs
         :return: a Rule
         """
-        return Rule(lambda: all(len(room.characters[time]) <= 1 for time, room in character.times.items()),
-                    test_at=RuleTag.MOVEMENT)
+        def can_place(other, room, time):
+            if other is character:
+                return room.count(time) == 0
+            return character[time] is not room
+
+        counter = RuleCounter(lambda time: character.board.count_with(character.id, time) > 1, character.times.keys())
+        return Rule(lambda: all(room.count(time) <= 1 for time, room in character.times.items()),
+                    test_at=RuleTag.MOVEMENT, debug_id=debug_id, can_place=can_place,
+                    incremental_function=lambda: counter.total == 0,
+                    on_move=counter.listener_for(character), board=character.board,
+                    feasible=lambda reachable: character.board.count_with(character.id, 1) == 1)
 
     @staticmethod
-    def create_is_at_least_one_time_not_alone(character: Character):
+    def create_is_at_least_one_time_not_alone(character: Character, debug_id=None):
         """
         Create a rule to test if a character is at least one time not alone
         :param character: The character that must be at least one time not alone
+        :param debug_id: The identifier of the rule in the debug and profiling outputs
         :return: a Rule
         """
-        return Rule(lambda: any(len(room.characters[time]) > 1 for time, room in character.times.items()),
-                    test_at=RuleTag.END)
+        counter = RuleCounter(lambda time: character.board.count_with(character.id, time) > 1, character.times.keys())
+        return Rule(lambda: any(room.count(time) > 1 for time, room in character.times.items()),
+                    test_at=RuleTag.END, debug_id=debug_id,
+                    incremental_function=lambda: counter.total > 0,
+                    on_move=counter.listener_for(character), board=character.board)
 
     @staticmethod
-    def create_everyone_at_least_one_time_not_alone(characters: list):
+    def create_everyone_at_least_one_time_not_alone(characters: list, debug_id=None):
         """
         Create a rule to test if everyone is at least one time not alone in the list of characters
         :param characters: The list of characters
+        :param debug_id: The identifier of the rule in the debug and profiling outputs
         :return: a Rule
         """
-        return Rule(lambda: all(any(len(room.characters[time]) > 1 for time, room in character.times.items())
-                                for character in characters), test_at=RuleTag.END)
+        counters = [RuleCounter(lambda time, c=character: c.board.count_with(c.id, time) > 1, character.times.keys())
+                    for character in characters]
+        listeners = [counter.listener_for(character) for counter, character in zip(counters, characters)]
+
+        def on_move(character_id, room_id, time):
+            for listener in listeners:
+                listener(character_id, room_id, time)
+
+        return Rule(lambda: all(any(room.count(time) > 1 for time, room in character.times.items())
+                                for character in characters), test_at=RuleTag.END, debug_id=debug_id,
+                    incremental_function=lambda: all(counter.total > 0 for counter in counters),
+                    on_move=on_move, board=characters[0].board if characters else None,
+                    feasible=lambda reachable: all(can_meet(reachable, character, characters)
+                                                   for character in characters))
+
+    @staticmethod
+    def create_different_start_rooms(characters: list, debug_id=None):
+        """
+        Create a rule to test if characters start in different rooms
+        :param characters: The list of characters
+        :param debug_id: The identifier of the rule in the debug and profiling outputs
+        :return: a Rule
+        """
+        return Rule(lambda: len({character[1] for character in characters}) == len(characters),
+                    test_at=RuleTag.START_ROOM, debug_id=debug_id,
+                    feasible=lambda reachable: len({character[1] for character in characters}) == len(characters))
 
     @staticmethod
-    def create_different_start_rooms(characters: list):
-        # TODO
-        pass
+    def create_different_start_rooms_for(character: Character, debug_id=None):
+        """
+        Create a rule to test if a character starts in a room where no other character starts
+        :param character: The character that must start alone
+        :param debug_id: The identifier of the rule in the debug and profiling outputs
+        :return: a Rule
+        """
+        return Rule(lambda: character[1].count(1) == 1, test_at=RuleTag.START_ROOM, debug_id=debug_id,
+                    feasible=lambda reachable: character.board.count_with(character.id, 1) == 1)
 
     @staticmethod
-    def create_different_start_rooms_for(character: Character):
-        # TODO
-        pass
-        return Rule(lambda: len(set(character.times.values())) == len(character.times), test_at=RuleTag.START_ROOM)
+    def create_never_twice_in_the_same_room(character: Character, debug_id=None):
+        """
+        Create a rule to test if a character is never twice in the same room
+        :param character: The character
+        :param debug_id: The identifier of the rule in the debug and profiling outputs
+        :return: a Rule
+        """
+        return Rule(lambda: len(set(character.times.values())) == len(character.times),
+                    test_at=RuleTag.END, debug_id=debug_id,
+                    path_filter=lambda other, path: other is not character or len(set(path)) == len(path))
 
     @staticmethod
-    def create_exactly_one_time_with_two_people_after_time(character: Character):
+    def create_everyone_at_least_twice_in_the_same_room(characters: list, debug_id=None):
+        """
+        Create a rule to test if every character of the list is at least twice in the same room
+        :param characters: The list of characters
+        :param debug_id: The identifier of the rule in the debug and profiling outputs
+        :return: a Rule
+        """
+        return Rule(lambda: all(len(set(character.times.values())) < len(character.times) for character in characters),
+                    test_at=RuleTag.END, debug_id=debug_id,
+                    path_filter=lambda other, path: other not in characters or len(set(path)) < len(path))
+
+    @staticmethod
+    def create_exactly_one_time_with_two_people_after_time(character: Character, debug_id=None):
         """
         Create a rule to test if a character is exactly one time with two people
         This rule is tested at the end of a time
         :param character: The character that must be exactly one time with two people
+        :param debug_id: The identifier of the rule in the debug and profiling outputs
         :return: a Rule
         """
-        return Rule(lambda: sum(len(room.characters[time]) == 2 for time, room in character.times.items()) <= 1,
-                    test_at=RuleTag.AFTER_A_TIME)
+        counter = RuleCounter(lambda time: character.board.count_with(character.id, time) == 2, character.times.keys())
+        return Rule(lambda: sum(room.count(time) == 2 for time, room in character.times.items()) <= 1,
+                    test_at=RuleTag.AFTER_A_TIME, debug_id=debug_id,
+                    incremental_function=lambda: counter.total <= 1,
+                    on_move=counter.listener_for(character), board=character.board)
 
     @staticmethod
-    def create_exactly_one_time_with_two_people(character: Character):
+    def create_exactly_one_time_with_two_people(character: Character, debug_id=None):
         """
         Create a rule to test if a character is exactly one time with two people
         This rule is tested at the end of the algorithm
         :param character: The character that must be exactly one time with two people
+        :param debug_id: The identifier of the rule in the debug and profiling outputs
         :return: a Rule
         """
-        return Rule(lambda: sum(len(room.characters[time]) == 2 for time, room in character.times.items()) == 1,
-                    test_at=RuleTag.END)
+        counter = RuleCounter(lambda time: character.board.count_with(character.id, time) == 2, character.times.keys())
+        return Rule(lambda: sum(room.count(time) == 2 for time, room in character.times.items()) == 1,
+                    test_at=RuleTag.END, debug_id=debug_id,
+                    incremental_function=lambda: counter.total == 1,
+                    on_move=counter.listener_for(character), board=character.board,
+                    feasible=lambda reachable: can_meet(reachable, character, character.board.characters))
 
     @staticmethod
-    def create_no_more_than_3_in_a_room(characters: list):
+    def create_no_more_than_3_in_a_room(characters: list, debug_id=None):
         """
         Create a rule to test if there is no more than 3 characters in a room at any time
         :param characters: The list of characters
+        :param debug_id: The identifier of the rule in the debug and profiling outputs
         :return: a Rule
         """
 
         def inner():
             rooms = [room for character in characters for room in character.times.values()]
-            return all(len(room.characters[time]) <= 3 for room in rooms for time in room.characters)
+            return all(room.count(time) <= 3 for room in rooms for time in room.characters)
+
+        # Counter of the (room, time) with more than 3 characters
+        board = characters[0].board
+        cells = [(room.id, time) for room in board.rooms for time in range(1, board.nb_times + 1)]
+        counter = RuleCounter(lambda cell: board.count(*cell) > 3, cells)
 
         f = lambda: inner()
-        return Rule(f, test_at=RuleTag.MOVEMENT, debug_id=3)
+        return Rule(f, test_at=RuleTag.MOVEMENT, debug_id=debug_id,
+                    can_place=lambda character, room, time: room.count(time) < 3,
+                    incremental_function=lambda: counter.total == 0,
+                    on_move=lambda character_id, room_id, time: counter.update((room_id, time)), board=board,
+                    feasible=lambda reachable: all(board.count(room.id, 1) <= 3 for room in board.rooms))
+
+
+class RuleCounter:
+    """
+    Incremental count of the keys verifying a condition, used by the rules to be tested in O(1).
+    A key is a time or a (room, time) whose condition only depends on the board at this key, so after a move only the
+    keys changed by the move need to be updated
+    """
+
+    def __init__(self, condition, keys=()):
+        """
+        :param condition: function key -> bool
+        :param keys: the keys to evaluate at the creation of the counter
+        """
+        self.condition = condition
+        self.values = {}
+        self.total = 0
+        for key in keys:
+            self.update(key)
+
+    def update(self, key):
+        """
+        Evaluate the condition of a key again and update the total
+        :param key: The key
+        """
+        value = bool(self.condition(key))
+        if value != self.values.get(key, False):
+            self.values[key] = value
+            self.total += 1 if value else -1
+
+    def listener_for(self, character):
+        """
+        Create a board listener updating a counter keyed by time, for a condition on the room of a character.
+        The time is only updated when the move changes the room of the character or the number of characters in it
+        :param character: The character
+        :return: a listener (character_id, room_id, time)
+        """
+        board = character.board
+        character_id = character.id
+
+        def on_move(moved_id, room_id, time):
+            if moved_id is None or moved_id == character_id or board.get_room_id(character_id, time) == room_id:
+                self.update(time)
+
+        return on_move
 
 
 def nb_max_characters_in_starting_room(part):
@@ -184,4 +363,18 @@ def nb_max_characters_in_starting_room(part):
     elif part == 2:
         return 1
     elif part == 3:
-        return 2
\ No newline at end of file
+        return 2
+
+
+def distinguished_characters(part):
+    """
+    Return the characters the rules of a part of the game treat differently from the others. The other characters can
+    be exchanged without changing the chances of a start configuration to have a solution
+    :param part: The part of the game
+    :return: The list of the names of the characters
+    """
+    if part == 1:
+        return ["Detective"]
+    # The ghost of the part 2 and the thief of the part 3 are drawn after the start rooms, so every character has the
+    # same role
+    return []
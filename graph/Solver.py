@@ -0,0 +1,151 @@
+from graph.PathIndex import PathIndex
+from graph.Rule import RuleTag, Rule
+
+
+class Solver:
+    """
+    Backtracking search with forward checking used to generate the movements of the characters.
+    The characters are given a whole path one by one, the paths being sampled from the precomputed index of the legal
+    paths of the manor (see PathIndex). The candidate paths of a character are first filtered once by the rules testing
+    a whole path, then pruned by the rules able to test a placement before it is made: after each path placed, the
+    allowed paths of every character without path are filtered, and the search backtracks as soon as one of them has
+    no path left.
+    """
+
+    def __init__(self, graph, rules=None, nb_times=6, nb_tests_max=20000, profiler=None):
+        """
+        :param graph: The graph with the characters already in their start rooms
+        :param rules: Rules the movements must respect
+        :param nb_times: Number of times
+        :param nb_tests_max: Maximum number of paths tried before giving up
+        :param profiler: Optional SearchProfiler collecting the rule evaluations and the backtracks of the search
+        """
+        if rules is None:
+            rules = []
+        self.graph = graph
+        self.rules = rules
+        self.nb_times = nb_times
+        self.nb_tests_max = nb_tests_max
+        self.nb_tests = 0
+        self.characters = list(graph.characters.values())
+        self.index = PathIndex.get(graph.board.rooms, nb_times=nb_times)
+
+        # Rules pruning the candidate paths, and movement rules that must be tested after each path placed
+        self.pruning_rules = [rule for rule in rules if rule.can_place is not None]
+        self.movement_rules = [rule for rule in rules if rule.can_place is None and rule.test_time == RuleTag.MOVEMENT]
+        self.path_filters = [rule.path_filter for rule in rules if rule.path_filter is not None]
+
+        # The instrumented functions are only used with a profiler, so that a search without profiler is not slowed down
+        self.profiler = profiler
+        if profiler is None:
+            self.test_rules = Rule.test_rules
+            self.can_place_functions = [rule.can_place for rule in self.pruning_rules]
+        else:
+            self.test_rules = profiler.test_rules
+            self.can_place_functions = [profiler.wrap_can_place(rule) for rule in self.pruning_rules]
+
+    def allowed_rooms(self, character, time):
+        """
+        Get the rooms where a character can be placed at a specific time according to the pruning rules
+        :param character: The character
+        :param time: The time
+        :return: the set of the allowed room ids
+        """
+        return {room.id for room in self.graph.board.rooms
+                if all(can_place(character, room, time) for can_place in self.can_place_functions)}
+
+    def allowed_paths(self, character):
+        """
+        Get the paths of the index starting in the start room of a character and allowed by the path filters and the
+        pruning rules
+        :param character: The character
+        :return: the list of paths, each path is a tuple of room ids
+        """
+        allowed = [self.allowed_rooms(character, time) for time in range(2, self.nb_times + 1)]
+        return [path for path in self.index.paths_from(character[1].id)
+                if all(path[t] in allowed[t - 1] for t in range(1, self.nb_times))
+                and all(path_filter(character, path) for path_filter in self.path_filters)]
+
+    def forward_check(self, domains, index, path):
+        """
+        Filter the allowed paths of every character without path after a path has been placed.
+        The pruning rules only depend on the characters in a room at a time, so a path can only be forbidden by the
+        rooms of the path placed, and only these rooms need to be tested for each character
+        :param domains: The lists of allowed paths of the characters before the path was placed
+        :param index: The index of the first character without path
+        :param path: The path placed, a tuple of room ids
+        :return: the new lists of allowed paths, None if a character is left without allowed path
+        """
+        rooms = self.graph.board.rooms
+        new_domains = list(domains)
+        for i in range(index, len(self.characters)):
+            character = self.characters[i]
+            forbidden = [t for t in range(1, self.nb_times)
+                         if not all(can_place(character, rooms[path[t]], t + 1)
+                                    for can_place in self.can_place_functions)]
+            if forbidden:
+                new_domains[i] = [other for other in domains[i] if all(other[t] != path[t] for t in forbidden)]
+                if not new_domains[i]:
+                    return None
+        return new_domains
+
+    def place_path(self, character, path):
+        """
+        Place a character in the rooms of a path, the start room excepted
+        :param character: The character
+        :param path: The path, a tuple of room ids
+        """
+        rooms = self.graph.board.rooms
+        for time in range(2, self.nb_times + 1):
+            character.set_room(rooms[path[time - 1]], time)
+
+    def remove_path(self, character):
+        """
+        Remove a character from its rooms, the start room excepted
+        :param character: The character
+        """
+        for time in range(2, self.nb_times + 1):
+            character.remove_room(time)
+
+    def solve(self):
+        """
+        Search the movements of the characters. The rooms are placed in the characters of the graph
+        :return: True if a solution has been found, False if there is none or if nb_tests_max has been reached
+        """
+        # The start rooms are not pruned, so they must respect the movement rules by themselves
+        solved = self.test_rules(self.rules, RuleTag.START_ROOM) and self.test_rules(self.rules, RuleTag.MOVEMENT)
+        if solved:
+            domains = [self.allowed_paths(character) for character in self.characters]
+            solved = all(domains) and self.inner_solve(domains, 0)
+        if self.profiler is not None:
+            self.profiler.on_search_end(solved, not solved and self.nb_tests >= self.nb_tests_max)
+        return solved
+
+    def inner_solve(self, domains, index):
+        """
+        Give a path to the character at the index, then to the following ones
+        :param domains: The lists of allowed paths of the characters
+        :param index: The index of the character
+        :return: True if a solution has been found, False otherwise
+        """
+        if index == len(self.characters):
+            return self.test_rules(self.rules, RuleTag.AFTER_A_TIME) and self.test_rules(self.rules, RuleTag.END)
+
+        character = self.characters[index]
+        candidates = list(domains[index])
+        self.graph.rng.shuffle(candidates)
+        for path in candidates:
+            if self.nb_tests >= self.nb_tests_max:
+                return False
+            self.nb_tests += 1
+            self.place_path(character, path)
+            if self.profiler is not None:
+                self.profiler.on_placement()
+            if self.test_rules(self.movement_rules, RuleTag.MOVEMENT):
+                new_domains = self.forward_check(domains, index + 1, path)
+                if new_domains is not None and self.inner_solve(new_domains, index + 1):
+                    return True
+            self.remove_path(character)
+            if self.profiler is not None:
+                self.profiler.on_backtrack(index)
+        return False
@@ -0,0 +1,155 @@
+import json
+import os
+
+from graph.Character import CHARACTER_NAMES
+from graph.Graph import Graph
+from graph.Rule import distinguished_characters
+from graph.Symmetry import room_automorphisms
+
+# File of the statistics learned by batch.py
+START_STATISTICS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "starts.json")
+
+
+class StartStatistics:
+    """
+    Number of tries and successes of each start configuration, by part of the game. A start configuration is the number
+    of characters in each start room and the start rooms of the characters the rules of the part distinguish (see
+    Rule.distinguished_characters), up to the symmetries of the map (see Symmetry.room_automorphisms): a symmetric
+    configuration has the same chances of success.
+
+    The statistics are used to draw the start configurations: a configuration drawn by Graph.random_start_rooms is kept
+    with a probability proportional to its estimated rate of success, so the configurations are drawn in proportion to
+    (uniform probability) x (estimated rate of success), and a puzzle is found after fewer tries. The estimated rate is
+    shrunk towards the rate of the whole part, so a configuration never tried has the average chances. As the
+    configuration of a seed then depends on the statistics, the seed doesn't give the same puzzle again.
+    """
+
+    # Weight of the rate of the part in the estimated rate of a configuration, as a number of tries
+    PRIOR_TRIES = 2
+
+    def __init__(self, counts=None):
+        """
+        :param counts: The dictionary part -> key of a configuration -> [tries, successes]. Empty by default
+        """
+        self.counts = {int(part): {key: list(value) for key, value in keys.items()}
+                       for part, keys in (counts or {}).items()}
+        # Counts recorded since the creation, to merge the statistics learned in several processes
+        self.updates = {}
+        # Rate of the part and maximum estimated rate of its configurations, by part, computed when drawing
+        self.rates = {}
+
+    @staticmethod
+    def key(part, rooms, start_room_ids):
+        """
+        Get the key of a start configuration, the same for all the configurations symmetric to it
+        :param part: The part of the game
+        :param rooms: The rooms, in the order of their ids
+        :param start_room_ids: The start room id of each character, in the order of the characters
+        :return: the key, a string
+        """
+        rooms = list(rooms)
+        distinguished = [start_room_ids[CHARACTER_NAMES.index(name)] for name in distinguished_characters(part)]
+        canonical = []
+        for permutation in room_automorphisms(rooms):
+            counts = [0] * len(rooms)
+            for room_id in start_room_ids:
+                counts[permutation[room_id]] += 1
+            canonical.append((counts, [permutation[room_id] for room_id in distinguished]))
+        counts, distinguished = min(canonical)
+        return "".join(map(str, counts)) + "-" + "".join(map(str, distinguished))
+
+    def record(self, part, rooms, start_room_ids, success):
+        """
+        Record a try of a start configuration
+        :param part: The part of the game
+        :param rooms: The rooms, in the order of their ids
+        :param start_room_ids: The start room id of each character, in the order of the characters
+        :param success: True if a puzzle has been found from the configuration
+        """
+        key = StartStatistics.key(part, rooms, start_room_ids)
+        for counts in (self.counts, self.updates):
+            tries_and_successes = counts.setdefault(part, {}).setdefault(key, [0, 0])
+            tries_and_successes[0] += 1
+            tries_and_successes[1] += bool(success)
+        self.rates.pop(part, None)
+
+    def merge(self, updates):
+        """
+        Add counts recorded by other statistics
+        :param updates: The updates of the other statistics
+        """
+        for part, keys in updates.items():
+            for key, (tries, successes) in keys.items():
+                tries_and_successes = self.counts.setdefault(int(part), {}).setdefault(key, [0, 0])
+                tries_and_successes[0] += tries
+                tries_and_successes[1] += successes
+            self.rates.pop(int(part), None)
+
+    def part_rate(self, part):
+        """
+        Get the rate of success of all the start configurations of a part
+        :param part: The part of the game
+        :return: the rate, 1 if no configuration has been tried
+        """
+        keys = self.counts.get(part, {})
+        tries = sum(tries for tries, _ in keys.values())
+        return sum(successes for _, successes in keys.values()) / tries if tries else 1.0
+
+    def rate(self, part, key, part_rate=None):
+        """
+        Get the estimated rate of success of a start configuration
+        :param part: The part of the game
+        :param key: The key of the configuration
+        :param part_rate: The rate of the part, computed if None
+        :return: the estimated rate
+        """
+        if part_rate is None:
+            part_rate = self.part_rate(part)
+        tries, successes = self.counts.get(part, {}).get(key, (0, 0))
+        return (successes + StartStatistics.PRIOR_TRIES * part_rate) / (tries + StartStatistics.PRIOR_TRIES)
+
+    def random_start_rooms(self, part, rooms, rng, nb_characters_max=1):
+        """
+        Draw the start rooms of the characters in proportion to the estimated rate of success of the configurations
+        :param part: The part of the game
+        :param rooms: The rooms, in the order of their ids
+        :param rng: The random generator
+        :param nb_characters_max: The maximum number of characters in a start room. With one character per room, the
+        start rooms are drawn by Graph.random_start_rooms alone, so that a seed gives the same puzzle as without
+        statistics
+        :return: the list of start rooms
+        """
+        if nb_characters_max == 1:
+            return Graph.random_start_rooms(rooms, nb_characters_max=1, rng=rng)
+        if part not in self.rates:
+            part_rate = self.part_rate(part)
+            self.rates[part] = part_rate, max([self.rate(part, key, part_rate) for key in self.counts.get(part, {})]
+                                              + [part_rate])
+        part_rate, max_rate = self.rates[part]
+        rooms = list(rooms)
+        ids = {room: room_id for room_id, room in enumerate(rooms)}
+        while True:
+            start_rooms = Graph.random_start_rooms(rooms, nb_characters_max=nb_characters_max, rng=rng)
+            key = StartStatistics.key(part, rooms, [ids[room] for room in start_rooms])
+            if max_rate == 0 or rng.random() * max_rate < self.rate(part, key, part_rate):
+                return start_rooms
+
+    def save(self, file=START_STATISTICS_FILE):
+        """
+        Write the statistics in a json file
+        :param file: The path of the file
+        """
+        with open(file, "w") as f:
+            json.dump(self.counts, f)
+
+    @staticmethod
+    def load(file=START_STATISTICS_FILE):
+        """
+        Read statistics written by save
+        :param file: The path of the file
+        :return: the statistics, empty if the file does not exist
+        """
+        if not os.path.exists(file):
+            return StartStatistics()
+        with open(file) as f:
+            return StartStatistics(json.load(f))
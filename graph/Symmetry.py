@@ -0,0 +1,77 @@
+import hashlib
+import itertools
+
+from graph.Character import CHARACTER_NAMES
+from graph.Rule import distinguished_characters
+
+# Permutations of the room ids keeping the adjacency of the rooms, by adjacency
+_automorphisms = {}
+# Tables of bytes.translate relabelling the room ids, by permutation
+_translation_tables = {}
+
+
+def room_automorphisms(rooms):
+    """
+    Get the permutations of the room ids keeping the adjacency of the rooms. For the map of Room.create_rooms, they are
+    the swaps of the Sing Room and the Dance Room, of the Stairs and the Hallway, and of the two sides of the map
+    :param rooms: The rooms, in the order of their ids
+    :return: a list of tuples, permutation[room id] = room id, the identity first
+    """
+    rooms = list(rooms)
+    # The ids are the positions in the list, so that the rooms don't need to be on a board
+    ids = {room: room_id for room_id, room in enumerate(rooms)}
+    adjacency = tuple(frozenset(ids[adjacent] for adjacent in room.adjacent_rooms) for room in rooms)
+    if adjacency not in _automorphisms:
+        _automorphisms[adjacency] = [permutation for permutation in itertools.permutations(range(len(rooms)))
+                                     if all(frozenset(permutation[i] for i in adjacency[room_id])
+                                            == adjacency[permutation[room_id]]
+                                            for room_id in range(len(rooms)))]
+    return _automorphisms[adjacency]
+
+
+def translation_table(permutation):
+    """
+    Get the table of bytes.translate relabelling room ids with a permutation
+    :param permutation: The permutation of the room ids
+    :return: the table, 256 bytes
+    """
+    if permutation not in _translation_tables:
+        _translation_tables[permutation] = bytes(permutation) + bytes(range(len(permutation), 256))
+    return _translation_tables[permutation]
+
+
+def canonical_form(graph, part):
+    """
+    Get the canonical form of a solved graph: two puzzles have the same form if one is the other with the rooms
+    relabelled by an automorphism of the map and the characters the rules don't distinguish exchanged (see
+    Rule.distinguished_characters). A character is described by whether its start room is given and by its rooms at
+    each time
+    :param graph: The graph with the movements of the characters
+    :param part: The part of the game
+    :return: the form as bytes, one row per character: 1 if its start room is given, 0 otherwise, then its room id at
+    each time. The rows of the distinguished characters come first in the order of distinguished_characters, then the
+    other rows sorted
+    """
+    distinguished = [CHARACTER_NAMES.index(name) for name in distinguished_characters(part)]
+    others = [character_id for character_id in range(len(graph.characters)) if character_id not in distinguished]
+    nb_times = graph.nb_times
+    # The room ids of all the characters at all the times, character after character, relabelled at once by each
+    # automorphism
+    positions = bytes(graph.board.positions)
+    given = [b"\x01" if character.information_given else b"\x00" for character in graph.characters.values()]
+    forms = []
+    for permutation in room_automorphisms(graph.board.rooms):
+        relabelled = positions.translate(translation_table(permutation))
+        rows = [given[i] + relabelled[i * nb_times:(i + 1) * nb_times] for i in range(len(given))]
+        forms.append(b"".join([rows[i] for i in distinguished] + sorted(rows[i] for i in others)))
+    return min(forms)
+
+
+def canonical_hash(graph, part):
+    """
+    Get a hash of the canonical form of a solved graph, the same for all the puzzles equivalent to it
+    :param graph: The graph with the movements of the characters
+    :param part: The part of the game
+    :return: the hash, a signed 64 bits integer
+    """
+    return int.from_bytes(hashlib.blake2b(canonical_form(graph, part), digest_size=8).digest(), "big", signed=True)
@@ -0,0 +1,149 @@
+import random
+
+import numpy as np
+
+from graph.Character import CHARACTER_NAMES
+from graph.Generator import PROBLEM_ID_MIN
+from graph.Graph import Graph
+from graph.Room import Room
+from graph.Rule import nb_max_characters_in_starting_room
+
+
+def neighbour_table(rooms):
+    """
+    Get the adjacent rooms of each room as arrays, from Room.adjacent_rooms
+    :param rooms: The rooms, in the order of their ids
+    :return: the array (room, i) of the id of the i-th adjacent room, padded with -1, and the array of the number of
+    adjacent rooms of each room
+    """
+    rooms = list(rooms)
+    ids = {room: room_id for room_id, room in enumerate(rooms)}
+    degrees = np.array([len(room.adjacent_rooms) for room in rooms], dtype=np.int64)
+    neighbours = np.full((len(rooms), degrees.max()), -1, dtype=np.int8)
+    for room_id, room in enumerate(rooms):
+        neighbours[room_id, :len(room.adjacent_rooms)] = [ids[adjacent] for adjacent in room.adjacent_rooms]
+    return neighbours, degrees
+
+
+def random_walks(nb_candidates, neighbours, degrees, nb_times, rng, nb_characters_max=1):
+    """
+    Draw candidate movements: the characters start with at most nb_characters_max characters per room, as with
+    Graph.random_start_rooms, then move to an adjacent room drawn uniformly at each time
+    :param nb_candidates: The number of candidates
+    :param neighbours: The adjacent rooms of each room (see neighbour_table)
+    :param degrees: The number of adjacent rooms of each room
+    :param nb_times: The number of times
+    :param rng: The numpy random generator
+    :param nb_characters_max: The maximum number of characters in a start room
+    :return: the array (candidate, character, time) of the room ids
+    """
+    nb_rooms = len(degrees)
+    movements = np.empty((nb_candidates, len(CHARACTER_NAMES), nb_times), dtype=np.int8)
+    # Each room appears once per character it can receive, the characters take the first places of a permutation
+    starts = np.tile(np.arange(nb_rooms, dtype=np.int8), (nb_candidates, nb_characters_max))
+    movements[:, :, 0] = rng.permuted(starts, axis=1)[:, :len(CHARACTER_NAMES)]
+    for t in range(1, nb_times):
+        rooms = movements[:, :, t - 1]
+        choices = (rng.random(rooms.shape) * degrees[rooms]).astype(np.int64)
+        movements[:, :, t] = neighbours[rooms, choices]
+    return movements
+
+
+def occupancy(movements, nb_rooms):
+    """
+    Count the characters in the rooms
+    :param movements: The array (candidate, character, time) of the room ids
+    :param nb_rooms: The number of rooms
+    :return: the array (candidate, time, room) of the number of characters in each room, and the array
+    (candidate, character, time) of the number of characters in the room of each character, the character included
+    """
+    room_counts = (movements[:, :, :, None] == np.arange(nb_rooms)).sum(axis=1)
+    counts_with = np.take_along_axis(room_counts, movements.transpose(0, 2, 1).astype(np.int64), axis=2)
+    return room_counts, counts_with.transpose(0, 2, 1)
+
+
+def respected_rules(part, movements, nb_rooms, rng):
+    """
+    Test the rules of a part on all the candidates at once, as Rule.rules_for_part does on a graph
+    :param part: The part of the game
+    :param movements: The array (candidate, character, time) of the room ids
+    :param nb_rooms: The number of rooms
+    :param rng: The numpy random generator, drawing the ghost or the thief of each candidate of the parts 2 and 3
+    :return: the array of booleans telling if each candidate respects the rules
+    """
+    room_counts, counts_with = occupancy(movements, nb_rooms)
+    # No more than 3 characters in a room
+    respected = room_counts.max(axis=(1, 2)) <= 3
+    if part == 1:
+        # The detective is exactly one time with exactly one other character
+        detective = CHARACTER_NAMES.index("Detective")
+        respected &= (counts_with[:, detective] == 2).sum(axis=1) == 1
+    elif part == 2:
+        # The ghost is always alone, and everyone else is at least one time not alone
+        candidates = np.arange(len(movements))
+        ghosts = rng.integers(0, len(CHARACTER_NAMES), len(movements))
+        respected &= (counts_with[candidates, ghosts] == 1).all(axis=1)
+        not_alone = (counts_with > 1).any(axis=2)
+        not_alone[candidates, ghosts] = True
+        respected &= not_alone.all(axis=1)
+    elif part == 3:
+        # The thief starts alone and is never twice in the same room, and everyone else is at least twice in the
+        # same room
+        candidates = np.arange(len(movements))
+        thieves = rng.integers(0, len(CHARACTER_NAMES), len(movements))
+        sorted_rooms = np.sort(movements, axis=2)
+        never_twice = (sorted_rooms[:, :, 1:] != sorted_rooms[:, :, :-1]).all(axis=2)
+        respected &= (counts_with[candidates, thieves, 0] == 1) & never_twice[candidates, thieves]
+        never_twice[candidates, thieves] = False
+        respected &= ~never_twice.any(axis=1)
+    return respected
+
+
+def graph_from_movements(movements, problem_id, given_information):
+    """
+    Create the graph of candidate movements. The graph has no seed, as no seed gives these movements
+    :param movements: The array (character, time) of the room ids
+    :param problem_id: The identifier of the problem, seeding the random generator of the graph
+    :param given_information: Number of information given about character's position in time 1
+    :return: the graph
+    """
+    rooms = Room.create_rooms()
+    room_list = list(rooms.values())
+    graph = Graph(nb_times=movements.shape[1], rooms=rooms, start_rooms=[room_list[path[0]] for path in movements],
+                  given_information=given_information, rng=random.Random(problem_id))
+    for character, path in zip(graph.characters.values(), movements):
+        for t in range(2, graph.nb_times + 1):
+            character.set_room(room_list[path[t - 1]], t)
+    return graph
+
+
+def generate_graphs_vectorized(part, given_information, seed=None, batch_size=4096, nb_times=6):
+    """
+    Generate graphs by drawing candidate movements by thousands: random walks over the adjacency of the rooms,
+    tested by array reductions instead of the rules and the search of Graph.movements. The candidates respecting the
+    rules become graphs, without end.
+    The movements follow the distribution of the random walks conditioned on the rules, which is not the distribution
+    of the search. No seed gives these graphs with generate_problem, so they have no seed: they are identified by
+    62 bits identifiers drawn above PROBLEM_ID_MIN, outside the ranges of the seeds
+    :param part: The part of the game
+    :param given_information: Number of information given about character's position in time 1
+    :param seed: The seed of the numpy random generator, random by default
+    :param batch_size: The number of candidates drawn at once
+    :param nb_times: The number of times
+    :return: a generator of (identifier, graph, number of candidates drawn since the previous graph)
+    """
+    rng = np.random.default_rng(seed)
+    neighbours, degrees = neighbour_table(Room.create_rooms().values())
+    # As in generate_problem, the parts 1 and 2 keep one character per start room
+    nb_start_max = nb_max_characters_in_starting_room(part) if part == 3 else 1
+    nb_candidates = 0
+    while True:
+        movements = random_walks(batch_size, neighbours, degrees, nb_times, rng, nb_characters_max=nb_start_max)
+        respected = respected_rules(part, movements, len(degrees), rng)
+        for i in range(len(movements)):
+            nb_candidates += 1
+            if not respected[i]:
+                continue
+            problem_id = int(rng.integers(PROBLEM_ID_MIN, 2 ** 62))
+            yield problem_id, graph_from_movements(movements[i], problem_id, given_information), nb_candidates
+            nb_candidates = 0
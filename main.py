@@ -1,10 +1,14 @@
 import argparse
-import math
+from concurrent.futures import ProcessPoolExecutor
 
 from graph.Graph import *
 from graph.Rule import *
+from graph.Generator import *
+from graph.Profiler import SearchProfiler
 from card.Card import *
 from card.Image_Creator import *
+from puzzle.Generator import generate_problem_from_seed
+from puzzle.PuzzleCache import PuzzleCache
 
 
 def get_args():
@@ -16,23 +20,20 @@ def get_args():
     parser.add_argument("--solution", action='store_true', default=False, help="Show the solution of the problem")
     parser.add_argument("--debug", action='store_true', default=False, help="Print debug information")
     parser.add_argument("--no_pdf", action='store_true', default=False, help="Prevent the pdf from being created")
+    parser.add_argument("--vector", action='store_true', default=False,
+                        help="Compose the cards in the pdf from the images of the icons instead of one image per card")
+    parser.add_argument("--dpi", type=int, default=None,
+                        help="Resolution of the cards in the pdf. The cards are then composed directly at this "
+                             "resolution")
+    parser.add_argument("--render_workers", type=int, default=1,
+                        help="Number of processes rasterizing the cards of the pdf")
+    parser.add_argument("--profile", action='store_true', default=False,
+                        help="Print the rule evaluations and the backtracks of the movement search")
+    parser.add_argument("--no_cache", action='store_true', default=False,
+                        help="Generate the problem even if it is in the cache of the generated problems")
     return parser.parse_args()
 
 
-def generate_problem(part, given_information, seed=None):
-    # Creation of the graph
-    rooms = Room.create_rooms()
-    nb_max = nb_max_characters_in_starting_room(part)
-    g = Graph(nb_times=6, given_information=given_information, rooms=rooms, seed=seed, nb_max_in_starting_room=nb_max)
-
-    # Rules
-    rules = Rule.rules_for_part(part, g)
-
-    # Generate movements
-    g.movements(rules=rules, nb_times=6)
-    return g
-
-
 def debug_print(g):
     g.show_information_given()
     g.show_matrix()
@@ -45,9 +46,7 @@ if __name__ == "__main__":
     seed = args.seed
 
     if seed:
-        part = math.floor(seed / 10000000)
-        if part not in [1, 2, 3]:
-            raise ValueError("Wrong seed")
+        part = part_from_seed(seed)
 
     print(f"\nCreation of a problem :\n\tPart : {part}\n\tSeed : {seed}\n"
           f"\tNumber of information given at start : {args.nb_information}\n\n")
@@ -57,17 +56,16 @@ if __name__ == "__main__":
         raise ValueError("Number of information given must be between 0 and 6")
 
     if not seed:
-        seed = random.randint(0, 10000000)
-        seed += 10000000 * part
-    random.seed(seed)
-
-    succes = False
-    while not succes:
-        try:
-            graph = generate_problem(part, given_information, seed)
-            succes = True
-        except Exception as e:
-            continue
+        seed = random_seed(part)
+    # A problem already generated is taken from the cache, unless the search is profiled
+    profiler = SearchProfiler() if args.profile else None
+    if args.no_cache or profiler is not None:
+        graph, cards, _ = generate_problem_from_seed(seed, given_information, profiler=profiler)
+    else:
+        graph, cards, _ = PuzzleCache().get_or_generate(seed, given_information)
+    if profiler is not None:
+        profiler.show()
+        print()
 
     if args.solution:
         if not seed:
@@ -75,14 +73,18 @@ if __name__ == "__main__":
         graph.show_matrix()
     else:
         if not args.no_pdf:
-            # Creation of cards and pdf
-            cards = Card.create_cards(graph, part=part)
-            create_pdf_from_cards(graph, cards, pdf_name=f"Kronologic_{graph.seed}.pdf", openPDF=True)
+            # Creation of the pdf
+            if args.render_workers > 1 and not args.vector:
+                with ProcessPoolExecutor(max_workers=args.render_workers) as executor:
+                    create_pdf_from_cards(graph, cards, pdf_name=f"Kronologic_{graph.seed}.pdf", openPDF=True,
+                                          executor=executor, dpi=args.dpi)
+            else:
+                create_pdf_from_cards(graph, cards, pdf_name=f"Kronologic_{graph.seed}.pdf", openPDF=True,
+                                      vector=args.vector, dpi=args.dpi)
         if args.debug:
             debug_print(graph)
         print("Your seed is : ", graph.seed)
 
 # TODO
 # Create verso of cards
-# Add a part for the solution
-# Rules for part 3
\ No newline at end of file
+# Add a part for the solution
\ No newline at end of file
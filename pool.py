@@ -0,0 +1,38 @@
+import argparse
+import time
+
+from puzzle.PuzzlePool import PuzzlePool, PUZZLE_POOL_FILE
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Keep a pool of problems generated ahead of time filled")
+    parser.add_argument("--parts", type=int, nargs="+", default=[1, 2], help="Parts of the game of the queues")
+    parser.add_argument("--nb_information", type=int, nargs="+", default=[6],
+                        help="Numbers of information given about character's position in time 1 of the queues")
+    parser.add_argument("--low", type=int, default=10, help="Number of problems of a queue under which it is filled")
+    parser.add_argument("--high", type=int, default=50, help="Number of problems of a queue after filling")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--pdf_dir", type=str, default=None,
+                        help="Directory where the pdfs of the problems are created")
+    parser.add_argument("--file", type=str, default=PUZZLE_POOL_FILE, help="File of the pool")
+    parser.add_argument("--once", action='store_true', default=False, help="Fill the queues once and exit")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = get_args()
+    keys = [(part, nb_information) for part in args.parts for nb_information in args.nb_information]
+    pool = PuzzlePool(keys, file=args.file, low_watermark=args.low, high_watermark=args.high, workers=args.workers,
+                      pdf_dir=args.pdf_dir)
+    if args.once:
+        print(f"{pool.refill()} problems added")
+    else:
+        with pool:
+            try:
+                while True:
+                    time.sleep(10)
+                    print(", ".join(f"part {part} / {n} information : {pool.size(part, n)}" for part, n in keys))
+            except KeyboardInterrupt:
+                pass
+    for part, nb_information in keys:
+        print(f"Part {part}, {nb_information} information : {pool.size(part, nb_information)} problems ready")
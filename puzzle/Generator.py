@@ -0,0 +1,68 @@
+import random
+
+from card.Uniqueness import create_unique_cards
+from graph.Generator import generate_problem, part_from_seed, start_room_ids
+from graph.VectorizedGenerator import generate_graphs_vectorized
+
+# Maximum number of start configurations tried before giving up
+NB_TRIES_MAX = 100
+
+
+def generate_problem_from_seed(seed, given_information, nb_tries_max=NB_TRIES_MAX, stats=None, profiler=None,
+                               start_statistics=None):
+    """
+    Generate the problem of a seed and its cards. A random generator is seeded, then start configurations are tried
+    until one of them has a solution whose cards admit no other solution. The global random module is not used, so
+    problems can be generated concurrently
+    :param seed: The seed of the game
+    :param given_information: Number of information given about character's position in time 1
+    :param nb_tries_max: Maximum number of start configurations tried before giving up
+    :param stats: Optional dictionary where the counters of the search are added (see Graph.movements)
+    :param profiler: Optional SearchProfiler collecting the rule evaluations and the backtracks of the searches
+    :param start_statistics: Optional StartStatistics drawing the start configurations and learning from the tries.
+    The start configurations of the parts with one character per start room are drawn as without statistics. Else
+    the seed doesn't give the problem again, and the graph has no seed
+    :return: the graph, the cards and the number of start configurations tried
+    """
+    part = part_from_seed(seed)
+    rng = random.Random(seed)
+    for nb_tries in range(1, nb_tries_max + 1):
+        try:
+            graph = generate_problem(part, given_information, seed, stats=stats, profiler=profiler, rng=rng,
+                                     start_statistics=start_statistics)
+        except Exception:
+            continue
+        cards = create_unique_cards(graph, part=part)
+        if start_statistics is not None:
+            start_statistics.record(part, graph.board.rooms, start_room_ids(graph), cards is not None)
+        if cards is not None:
+            return graph, cards, nb_tries
+    raise Exception(f"No problem found after {nb_tries_max} tries")
+
+
+def generate_problems_vectorized(part, given_information, nb_problems, seed=None, batch_size=4096, nb_times=6):
+    """
+    Generate problems from the graphs of generate_graphs_vectorized, keeping the graphs whose cards admit no other
+    solution. No seed gives these problems, so their cards show none
+    :param part: The part of the game
+    :param given_information: Number of information given about character's position in time 1
+    :param nb_problems: The number of problems
+    :param seed: The seed of the numpy random generator, random by default
+    :param batch_size: The number of candidates drawn at once
+    :param nb_times: The number of times
+    :return: a generator of (identifier, graph, cards, number of candidates drawn since the previous problem)
+    """
+    if nb_problems <= 0:
+        return
+    nb_candidates = 0
+    for problem_id, graph, nb_graph_candidates in generate_graphs_vectorized(part, given_information, seed=seed,
+                                                                             batch_size=batch_size, nb_times=nb_times):
+        nb_candidates += nb_graph_candidates
+        cards = create_unique_cards(graph, part=part)
+        if cards is None:
+            continue
+        yield problem_id, graph, cards, nb_candidates
+        nb_candidates = 0
+        nb_problems -= 1
+        if nb_problems == 0:
+            return
@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import numpy as np
+
+from graph.Graph import Graph
+from graph.Room import Room
+from graph.Generator import GENERATOR_VERSION, part_from_seed
+from card.Card import Card
+from puzzle.Generator import generate_problem_from_seed
+
+# File of the cache, created at the first use
+PUZZLE_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "puzzles.sqlite")
+
+# Every icon of a card is stored as one byte, its index in this list. The list must only be extended: changing an
+# index would make the stored icons wrong
+ICONS = ["Retry"] + [f"X{n}" for n in range(7)] + [f"T{t}" for t in range(1, 7)] + \
+        ["Aventuriere", "Baronne", "Chauffeur", "Detective", "Journaliste", "Servante"]
+ICON_CODES = {icon: code for code, icon in enumerate(ICONS)}
+
+
+class PuzzleCache:
+    """
+    Cache on disk of the generated puzzles, keyed by (seed, part, number of information given, generator version).
+    A puzzle is stored in a SQLite table as a few bytes: the room id of each character at each time, the characters
+    whose start room is given and the icons of the cards. Getting a puzzle again (to reprint it or to show its
+    solution) rebuilds the graph and the cards from these bytes without any search.
+    The number of puzzles is bounded: the least recently used ones are removed when the cache is full.
+    """
+
+    def __init__(self, file=PUZZLE_CACHE_FILE, max_size=100000, version=GENERATOR_VERSION):
+        """
+        :param file: The path of the SQLite file
+        :param max_size: Maximum number of puzzles kept
+        :param version: The version of the generator, puzzles of other versions are never returned
+        """
+        self.file = file
+        self.max_size = max_size
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        with closing(self.connect()) as connection, connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS puzzles ("
+                               "seed INTEGER, part INTEGER, nb_information INTEGER, version INTEGER, "
+                               "movements BLOB, information INTEGER, icons BLOB, tries INTEGER, last_used REAL, "
+                               "PRIMARY KEY (seed, part, nb_information, version))")
+            connection.execute("CREATE INDEX IF NOT EXISTS puzzles_last_used ON puzzles (last_used)")
+
+    def connect(self):
+        """
+        Open a connection to the file. A connection is opened for each operation, so that a cache can be shared
+        between threads and processes
+        :return: a sqlite3 connection
+        """
+        return sqlite3.connect(self.file, timeout=30)
+
+    def get(self, seed, given_information):
+        """
+        Get a puzzle from the cache
+        :param seed: The seed of the game
+        :param given_information: Number of information given about character's position in time 1
+        :return: the graph, the cards and the number of start configurations tried, None if the puzzle is not cached
+        """
+        key = (seed, part_from_seed(seed), given_information, self.version)
+        with closing(self.connect()) as connection, connection:
+            row = connection.execute("SELECT movements, information, icons, tries FROM puzzles WHERE seed = ? AND "
+                                     "part = ? AND nb_information = ? AND version = ?", key).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            connection.execute("UPDATE puzzles SET last_used = ? WHERE seed = ? AND part = ? AND nb_information = ? "
+                               "AND version = ?", (time.time(),) + key)
+        self.hits += 1
+        movements, information, icons, nb_tries = row
+        graph, cards = PuzzleCache.decode(seed, given_information, movements, information, icons)
+        return graph, cards, nb_tries
+
+    def put(self, graph, cards, nb_tries):
+        """
+        Store a puzzle in the cache, then remove the least recently used puzzles if the cache is full
+        :param graph: The graph of the puzzle, with its seed
+        :param cards: The cards of the puzzle
+        :param nb_tries: The number of start configurations tried
+        """
+        movements, information, icons = PuzzleCache.encode(graph, cards)
+        key = (graph.seed, part_from_seed(graph.seed), graph.given_information, self.version)
+        with closing(self.connect()) as connection, connection:
+            connection.execute("INSERT OR REPLACE INTO puzzles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               key + (movements, information, icons, nb_tries, time.time()))
+            size = connection.execute("SELECT COUNT(*) FROM puzzles").fetchone()[0]
+            if size > self.max_size:
+                connection.execute("DELETE FROM puzzles WHERE rowid IN "
+                                   "(SELECT rowid FROM puzzles ORDER BY last_used LIMIT ?)", (size - self.max_size,))
+
+    def get_or_generate(self, seed, given_information):
+        """
+        Get a puzzle from the cache, or generate it and store it
+        :param seed: The seed of the game
+        :param given_information: Number of information given about character's position in time 1
+        :return: the graph, the cards and the number of start configurations tried
+        """
+        puzzle = self.get(seed, given_information)
+        if puzzle is None:
+            puzzle = generate_problem_from_seed(seed, given_information)
+            self.put(*puzzle)
+        return puzzle
+
+    def __len__(self):
+        with closing(self.connect()) as connection:
+            return connection.execute("SELECT COUNT(*) FROM puzzles").fetchone()[0]
+
+    @staticmethod
+    def encode(graph, cards):
+        """
+        Encode a puzzle as bytes
+        :param graph: The graph of the puzzle
+        :param cards: The cards of the puzzle, one per room
+        :return: the room ids of the characters at each time, the bits of the characters whose start room is given and
+        the icons of the cards in the order of the rooms
+        """
+        characters = list(graph.characters.values())
+        movements = bytes(character[t].id for character in characters for t in range(1, graph.nb_times + 1))
+        information = sum(1 << i for i, character in enumerate(characters) if character.information_given)
+        cards = sorted(cards, key=lambda card: card.room.id)
+        icons = bytes(ICON_CODES[icon] for card in cards for icon in card.icons.flat)
+        return movements, information, icons
+
+    @staticmethod
+    def decode(seed, given_information, movements, information, icons, nb_times=6, part=None):
+        """
+        Rebuild a puzzle encoded with encode
+        :param seed: The seed of the game, None for a puzzle without seed
+        :param given_information: Number of information given about character's position in time 1
+        :param movements: The room ids of the characters at each time
+        :param information: The bits of the characters whose start room is given
+        :param icons: The icons of the cards in the order of the rooms
+        :param nb_times: The number of times
+        :param part: The part of the game, the part of the seed by default
+        :return: the graph and the cards
+        """
+        rooms = Room.create_rooms()
+        room_list = list(rooms.values())
+        start_rooms = [room_list[movements[i]] for i in range(0, len(movements), nb_times)]
+        graph = Graph(nb_times=nb_times, rooms=rooms, start_rooms=start_rooms, seed=seed)
+        for i, character in enumerate(graph.characters.values()):
+            for t in range(2, nb_times + 1):
+                character.set_room(graph.board.rooms[movements[i * nb_times + t - 1]], t)
+            character.information_given = bool(information >> i & 1)
+        graph.given_information = given_information
+
+        if part is None:
+            part = part_from_seed(seed)
+        cards = []
+        nb_icons = 24
+        for room in graph.board.rooms:
+            card_icons = np.array([ICONS[code] for code in icons[room.id * nb_icons:(room.id + 1) * nb_icons]],
+                                  dtype=object).reshape((6, 4))
+            cards.append(Card.from_icons(room, card_icons, seed=seed, part=part))
+        return graph, cards
@@ -0,0 +1,199 @@
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import closing
+
+from graph.Generator import random_seed
+from puzzle.Generator import generate_problem_from_seed
+from puzzle.PuzzleCache import PuzzleCache
+
+# File of the pool, created at the first use
+PUZZLE_POOL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pool.sqlite")
+
+
+def generate_pooled_puzzle(seed, given_information, pdf_dir=None):
+    """
+    Generate a puzzle of the pool. Run in a worker process
+    :param seed: The seed
+    :param given_information: Number of information given about character's position in time 1
+    :param pdf_dir: Directory where the pdf of the puzzle is created, None to create no pdf
+    :return: the seed, the encoded puzzle (see PuzzleCache.encode), the number of tries and the pdf file or None
+    """
+    graph, cards, nb_tries = generate_problem_from_seed(seed, given_information)
+    pdf_file = None
+    if pdf_dir is not None:
+        # Imported here so that the images are only loaded by the workers creating pdfs, after the fork
+        from card.Image_Creator import create_pdf_from_cards
+        os.makedirs(pdf_dir, exist_ok=True)
+        pdf_file = os.path.abspath(os.path.join(pdf_dir, f"Kronologic_{seed}_{given_information}.pdf"))
+        create_pdf_from_cards(graph, cards, pdf_name=pdf_file, openPDF=False)
+    return seed, PuzzleCache.encode(graph, cards), nb_tries, pdf_file
+
+
+class PuzzlePool:
+    """
+    Pool of puzzles generated ahead of time, one queue per (part, number of information given).
+    The queues are a table of a SQLite file, so the puzzles ready survive a restart and can be shared between
+    processes. A background thread watches the queues: when a queue has less than low_watermark puzzles, it is filled
+    up to high_watermark puzzles by a pool of worker processes. Getting a puzzle only pops the oldest one of its queue,
+    the search is only run by the caller when the queue is empty.
+    """
+
+    def __init__(self, keys, file=PUZZLE_POOL_FILE, low_watermark=10, high_watermark=50, workers=None, pdf_dir=None,
+                 interval=1.0):
+        """
+        :param keys: The (part, number of information given) of the queues
+        :param file: The path of the SQLite file
+        :param low_watermark: Number of puzzles of a queue under which the queue is filled
+        :param high_watermark: Number of puzzles of a queue after filling
+        :param workers: Number of worker processes. The number of cores by default
+        :param pdf_dir: Directory where the pdfs of the puzzles are created, None to create no pdf
+        :param interval: Time in seconds between two checks of the queues
+        """
+        if not 0 <= low_watermark <= high_watermark:
+            raise ValueError("The watermarks must verify 0 <= low_watermark <= high_watermark")
+        self.keys = list(keys)
+        self.file = file
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.workers = workers
+        self.pdf_dir = pdf_dir
+        self.interval = interval
+        self.thread = None
+        self.stopped = threading.Event()
+        self.wake_up = threading.Event()
+        with closing(self.connect()) as connection, connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS pool ("
+                               "id INTEGER PRIMARY KEY AUTOINCREMENT, part INTEGER, nb_information INTEGER, "
+                               "seed INTEGER, movements BLOB, information INTEGER, icons BLOB, tries INTEGER, "
+                               "pdf TEXT, "
+                               "UNIQUE (part, nb_information, seed))")
+
+    def connect(self):
+        """
+        Open a connection to the file, one for each operation so that the pool can be used from several threads
+        :return: a sqlite3 connection
+        """
+        return sqlite3.connect(self.file, timeout=30)
+
+    def size(self, part, given_information):
+        """
+        Get the number of puzzles ready in a queue
+        :param part: The part of the game
+        :param given_information: Number of information given about character's position in time 1
+        :return: the number of puzzles
+        """
+        with closing(self.connect()) as connection:
+            return connection.execute("SELECT COUNT(*) FROM pool WHERE part = ? AND nb_information = ?",
+                                      (part, given_information)).fetchone()[0]
+
+    def pop(self, part, given_information):
+        """
+        Get a puzzle, the oldest of its queue. If the queue is empty, the puzzle is generated now
+        :param part: The part of the game
+        :param given_information: Number of information given about character's position in time 1
+        :return: the graph, the cards and the pdf file of the puzzle. The pdf file is None if the pool creates no pdf.
+        The caller owns the pdf file
+        """
+        with closing(self.connect()) as connection, connection:
+            # The write lock is taken first so that two processes never pop the same puzzle
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute("SELECT id, seed, movements, information, icons, pdf FROM pool WHERE part = ? "
+                                     "AND nb_information = ? ORDER BY id LIMIT 1", (part, given_information)).fetchone()
+            if row is not None:
+                connection.execute("DELETE FROM pool WHERE id = ?", (row[0],))
+        self.wake_up.set()
+
+        if row is None:
+            seed, encoded, _, pdf_file = generate_pooled_puzzle(random_seed(part), given_information, self.pdf_dir)
+        else:
+            _, seed, movements, information, icons, pdf_file = row
+            encoded = (movements, information, icons)
+        graph, cards = PuzzleCache.decode(seed, given_information, *encoded)
+        return graph, cards, pdf_file
+
+    def refill(self, executor=None):
+        """
+        Fill the queues under the low watermark up to the high watermark
+        :param executor: The executor generating the puzzles. A new one is created and shut down by default
+        :return: the number of puzzles added
+        """
+        missing = {}
+        for part, given_information in self.keys:
+            size = self.size(part, given_information)
+            if size < self.low_watermark:
+                missing[(part, given_information)] = self.high_watermark - size
+        if not missing:
+            return 0
+
+        if executor is None:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                return self.refill(executor)
+
+        futures = {}
+        for (part, given_information), nb_missing in missing.items():
+            seeds = set()
+            while len(seeds) < nb_missing:
+                seeds.add(random_seed(part))
+            for seed in seeds:
+                future = executor.submit(generate_pooled_puzzle, seed, given_information, self.pdf_dir)
+                futures[future] = (part, given_information)
+
+        nb_added = 0
+        for future in as_completed(futures):
+            if self.stopped.is_set():
+                break
+            try:
+                seed, (movements, information, icons), nb_tries, pdf_file = future.result()
+            except Exception:
+                continue
+            part, given_information = futures[future]
+            with closing(self.connect()) as connection, connection:
+                cursor = connection.execute("INSERT OR IGNORE INTO pool (part, nb_information, seed, movements, "
+                                            "information, icons, tries, pdf) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                            (part, given_information, seed, movements, information, icons, nb_tries,
+                                             pdf_file))
+                nb_added += cursor.rowcount
+        return nb_added
+
+    def run(self):
+        """
+        Loop of the background thread: the queues are checked every interval seconds, or as soon as a puzzle is popped
+        """
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            while not self.stopped.is_set():
+                self.refill(executor)
+                self.wake_up.wait(self.interval)
+                self.wake_up.clear()
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def start(self):
+        """
+        Start the background thread filling the queues
+        """
+        if self.thread is not None:
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name="PuzzlePool", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop the background thread. The puzzles not being generated yet are cancelled
+        """
+        if self.thread is None:
+            return
+        self.stopped.set()
+        self.wake_up.set()
+        self.thread.join()
+        self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,276 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+
+from graph.Generator import part_from_seed, random_seed
+from puzzle.Generator import generate_problem_from_seed
+from puzzle.PuzzleCache import PuzzleCache
+
+# Maximum size of the request line and of each header line
+MAX_LINE_SIZE = 8192
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON server generating problems and their pdfs")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Host of the server")
+    parser.add_argument("--port", type=int, default=8080, help="Port of the server")
+    parser.add_argument("--unix", type=str, default=None, help="Path of a Unix socket, used instead of host and port")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--max_pending", type=int, default=64,
+                        help="Maximum number of jobs waiting for a worker, further requests are answered with 503")
+    parser.add_argument("--no_cache", action='store_true', default=False,
+                        help="Do not use the cache of the generated problems")
+    return parser.parse_args()
+
+
+def init_worker():
+    """
+    Load the images of the cards once in each worker process, so that rendering a pdf does not read the assets again
+    """
+    from card.Image_Creator import images, IMAGE_FILES
+    for name in IMAGE_FILES:
+        images.get(name)
+
+
+def get_puzzle(seed, given_information, use_cache):
+    """
+    Get the problem of a seed, from the cache of the generated problems if it is there
+    :param seed: The seed
+    :param given_information: Number of information given about character's position in time 1
+    :param use_cache: If True, the cache is used
+    :return: the graph, the cards and the number of tries
+    """
+    if use_cache:
+        return PuzzleCache().get_or_generate(seed, given_information)
+    return generate_problem_from_seed(seed, given_information)
+
+
+def generate_job(seed, given_information, use_cache):
+    """
+    Generate a problem. Run in a worker process
+    :param seed: The seed
+    :param given_information: Number of information given about character's position in time 1
+    :param use_cache: If True, the cache of the generated problems is used
+    :return: a dictionary with the seed, the part, the characters whose start room is given and the cards
+    """
+    graph, cards, nb_tries = get_puzzle(seed, given_information, use_cache)
+    return {
+        "seed": seed,
+        "part": part_from_seed(seed),
+        "nb_information": given_information,
+        "tries": nb_tries,
+        "information": {character.name: character[1].name for character in graph.characters.values()
+                        if character.information_given},
+        "cards": {card.room.name: card.icons.tolist() for card in cards},
+    }
+
+
+def solution_job(seed, given_information, use_cache):
+    """
+    Get the solution of a problem. Run in a worker process
+    :param seed: The seed
+    :param given_information: Number of information given about character's position in time 1
+    :param use_cache: If True, the cache of the generated problems is used
+    :return: a dictionary with the seed and the room of each character at each time
+    """
+    graph, _, _ = get_puzzle(seed, given_information, use_cache)
+    return {
+        "seed": seed,
+        "solution": {character.name: [character[t].name for t in range(1, graph.nb_times + 1)]
+                     for character in graph.characters.values()},
+    }
+
+
+def pdf_job(seed, given_information, use_cache):
+    """
+    Create the pdf of a problem. Run in a worker process
+    :param seed: The seed
+    :param given_information: Number of information given about character's position in time 1
+    :param use_cache: If True, the cache of the generated problems is used
+    :return: the content of the pdf
+    """
+    from card.Image_Creator import create_pdf_from_cards
+    graph, cards, _ = get_puzzle(seed, given_information, use_cache)
+    with tempfile.TemporaryDirectory() as directory:
+        pdf_file = os.path.join(directory, f"Kronologic_{seed}.pdf")
+        create_pdf_from_cards(graph, cards, pdf_name=pdf_file, openPDF=False)
+        with open(pdf_file, "rb") as f:
+            return f.read()
+
+
+class HTTPError(Exception):
+    """
+    Error answered to the client with a status code
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class PuzzleServer:
+    """
+    Asyncio HTTP server of the problems. The endpoints are:
+    - GET /generate?part=1&nb_information=6 or /generate?seed=10000000&nb_information=6: the problem as json
+    - GET /solution?seed=10000000&nb_information=6: the solution as json
+    - GET /pdf?seed=10000000&nb_information=6: the pdf of the problem
+    The generation and the rendering run in a pool of worker processes. Identical requests being processed share the
+    same job, and the requests are answered with 503 when too many jobs are waiting.
+    """
+
+    ENDPOINTS = {
+        "/generate": generate_job,
+        "/solution": solution_job,
+        "/pdf": pdf_job,
+    }
+
+    def __init__(self, executor, max_pending=64, use_cache=True):
+        """
+        :param executor: The executor running the jobs
+        :param max_pending: Maximum number of jobs being processed
+        :param use_cache: If True, the workers use the cache of the generated problems
+        """
+        self.executor = executor
+        self.max_pending = max_pending
+        self.use_cache = use_cache
+        # Jobs being processed, by (endpoint, seed, number of information given)
+        self.jobs = {}
+
+    async def run_job(self, path, seed, given_information):
+        """
+        Run a job in the executor, or wait for the same job if it is already being processed
+        :param path: The path of the endpoint
+        :param seed: The seed
+        :param given_information: Number of information given about character's position in time 1
+        :return: the result of the job
+        """
+        key = (path, seed, given_information)
+        if key not in self.jobs:
+            if len(self.jobs) >= self.max_pending:
+                raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Too many requests, try again later")
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, PuzzleServer.ENDPOINTS[path], seed, given_information,
+                                          self.use_cache)
+            self.jobs[key] = future
+            future.add_done_callback(lambda _: self.jobs.pop(key, None))
+        # Shielded so that a client disconnecting does not cancel the job of the other clients
+        return await asyncio.shield(self.jobs[key])
+
+    async def handle(self, method, target):
+        """
+        Answer a request
+        :param method: The method of the request
+        :param target: The target of the request, path and query
+        :return: the status, the content type and the body
+        """
+        url = urlsplit(target)
+        if url.path not in PuzzleServer.ENDPOINTS:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown endpoint {url.path}")
+        if method != "GET":
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Only GET is allowed")
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            given_information = int(query.get("nb_information", 6))
+            if "seed" in query:
+                seed = int(query["seed"])
+                part_from_seed(seed)
+            elif url.path == "/generate":
+                seed = random_seed(int(query.get("part", 1)))
+                part_from_seed(seed)
+            else:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "A seed must be given")
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Wrong seed, part or number of information")
+        if not 0 <= given_information <= 6:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Number of information given must be between 0 and 6")
+
+        try:
+            result = await self.run_job(url.path, seed, given_information)
+        except HTTPError:
+            raise
+        except Exception as e:
+            raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+        if url.path == "/pdf":
+            return HTTPStatus.OK, "application/pdf", result
+        return HTTPStatus.OK, "application/json", json.dumps(result).encode()
+
+    async def on_connection(self, reader, writer):
+        """
+        Read the requests of a connection and answer them. The connection is kept alive unless the client closes it
+        :param reader: The stream reader
+        :param writer: The stream writer
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                if len(request_line) > MAX_LINE_SIZE:
+                    await self.answer(writer, HTTPStatus.REQUEST_URI_TOO_LONG, "application/json", b"{}", False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                parts = request_line.decode("latin-1").split()
+                keep_alive = len(parts) == 3 and parts[2] == "HTTP/1.1" and headers.get("connection") != "close"
+                try:
+                    if len(parts) != 3:
+                        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request")
+                    status, content_type, body = await self.handle(parts[0], parts[1])
+                except HTTPError as e:
+                    status, content_type = e.status, "application/json"
+                    body = json.dumps({"error": str(e)}).encode()
+                await self.answer(writer, status, content_type, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def answer(writer, status, content_type, body, keep_alive):
+        """
+        Write a response
+        :param writer: The stream writer
+        :param status: The HTTP status
+        :param content_type: The content type of the body
+        :param body: The body, as bytes
+        :param keep_alive: If False, the client is told that the connection is closed
+        """
+        head = f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: {content_type}\r\n" \
+               f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        if status == HTTPStatus.SERVICE_UNAVAILABLE:
+            head += "Retry-After: 1\r\n"
+        writer.write(head.encode("latin-1") + b"\r\n" + body)
+        await writer.drain()
+
+
+async def serve(args):
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker) as executor:
+        server = PuzzleServer(executor, max_pending=args.max_pending, use_cache=not args.no_cache)
+        if args.unix:
+            listener = await asyncio.start_unix_server(server.on_connection, path=args.unix)
+            print(f"Serving on {args.unix}")
+        else:
+            listener = await asyncio.start_server(server.on_connection, host=args.host, port=args.port)
+            print(f"Serving on http://{args.host}:{args.port}")
+        async with listener:
+            await listener.serve_forever()
+
+
+if __name__ == "__main__":
+    args = get_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass